@@ -1,5 +1,11 @@
 from django.conf import settings
 
+# Settings don't change during the process lifetime, so normalize the
+# allowed origins once at import and use O(1) set lookups per request.
+_ALLOWED = frozenset(a.rstrip('/') for a in getattr(settings, 'CORS_ALLOWED_ORIGINS', []) or [])
+_ALLOW_ALL = bool(getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False))
+
+
 class EnsureCorsHeaderMiddleware:
     """Fallback middleware to ensure CORS header is present on responses.
 
@@ -14,23 +20,15 @@ class EnsureCorsHeaderMiddleware:
 
     def __call__(self, request):
         response = self.get_response(request)
-        try:
-            origin = request.META.get('HTTP_ORIGIN')
-            if not origin:
-                return response
-            # If corsheaders already set the header, do nothing
-            if response.get('Access-Control-Allow-Origin'):
-                return response
-            # Allow all origins if configured
-            if getattr(settings, 'CORS_ALLOW_ALL_ORIGINS', False):
-                response['Access-Control-Allow-Origin'] = '*'
-                return response
-            allowed = getattr(settings, 'CORS_ALLOWED_ORIGINS', []) or []
-            # Normalize
-            allowed_norm = [a.rstrip('/') for a in allowed]
-            if origin.rstrip('/') in allowed_norm:
-                response['Access-Control-Allow-Origin'] = origin
-        except Exception:
-            # Never let this middleware raise and block responses
-            pass
+        # Common case: corsheaders already set the header, do nothing
+        if 'Access-Control-Allow-Origin' in response.headers:
+            return response
+        origin = request.META.get('HTTP_ORIGIN')
+        if not origin:
+            return response
+        # Allow all origins if configured
+        if _ALLOW_ALL:
+            response['Access-Control-Allow-Origin'] = '*'
+        elif origin.rstrip('/') in _ALLOWED:
+            response['Access-Control-Allow-Origin'] = origin
         return response
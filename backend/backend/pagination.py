@@ -1,3 +1,4 @@
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
 
 
@@ -10,4 +11,36 @@ class LargePageNumberPagination(PageNumberPagination):
     """
     page_size = 50
     page_size_query_param = 'page_size'
-    max_page_size = 10000
+    # the preview timeline requests page_size=1000; nothing asks for more
+    max_page_size = 1000
+    # deep pages force a huge OFFSET scan; pages beyond this are a 404
+    max_page_number = 10000
+
+    def get_page_number(self, request, paginator):
+        page_number = request.query_params.get(self.page_query_param) or 1
+        if page_number in self.last_page_strings:
+            return paginator.num_pages
+        try:
+            page_number = int(page_number)
+        except (TypeError, ValueError):
+            raise ValidationError({self.page_query_param: 'must be an integer'})
+        if page_number > self.max_page_number:
+            raise NotFound(self.invalid_page_message)
+        # past-the-end pages (> num_pages) get DRF's own 404 from paginate_queryset
+        return max(1, page_number)
+
+    def get_next_link(self):
+        # don't advertise a next page the cap would refuse
+        if self.page.number >= self.max_page_number:
+            return None
+        return super().get_next_link()
+
+    def get_page_size(self, request):
+        page_size = request.query_params.get(self.page_size_query_param)
+        if page_size is None or page_size == '':
+            return self.page_size
+        try:
+            page_size = int(page_size)
+        except (TypeError, ValueError):
+            raise ValidationError({self.page_size_query_param: 'must be an integer'})
+        return max(1, min(page_size, self.max_page_size))
@@ -34,8 +34,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 # Fallback middleware to ensure CORS header on responses when corsheaders
-# didn't set it (safety net for some proxy or 404 cases).
-MIDDLEWARE.append('backend.middleware.EnsureCorsHeaderMiddleware')
+# didn't set it (safety net for some proxy or 404 cases). Only installed for
+# local development or when explicitly requested with ENABLE_CORS_FALLBACK=1
+# so deployments with a working corsheaders don't pay for it per response.
+if DEBUG or os.environ.get('ENABLE_CORS_FALLBACK') == '1':
+    MIDDLEWARE.append('backend.middleware.EnsureCorsHeaderMiddleware')
 
 ROOT_URLCONF = 'backend.urls'
 
@@ -56,6 +59,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'backend.wsgi.application'
+ASGI_APPLICATION = 'backend.asgi.application'
 
 # Database configuration
 # Prefer a full DATABASE_URL (as provided by Render managed DB). Fall back to
@@ -82,6 +86,7 @@ if DATABASE_URL:
                 'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
                 'HOST': os.environ.get('DATABASE_HOST', 'db'),
                 'PORT': os.environ.get('DATABASE_PORT', '5432'),
+                'CONN_MAX_AGE': 600,
             }
         }
 else:
@@ -93,9 +98,15 @@ else:
             'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'password'),
             'HOST': os.environ.get('DATABASE_HOST', 'db'),
             'PORT': os.environ.get('DATABASE_PORT', '5432'),
+            'CONN_MAX_AGE': 600,
         }
     }
 
+# Persistent connections (CONN_MAX_AGE) avoid reconnecting to Postgres on every
+# request; health checks make sure a reused connection that the server closed
+# in the meantime is replaced instead of failing the request.
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
 AUTH_PASSWORD_VALIDATORS = []
 
 LANGUAGE_CODE = 'en-us'
@@ -1,10 +1,16 @@
 from django.urls import path, include
 from django.contrib import admin
-from django.http import JsonResponse
+from django.http import HttpResponse
+from django.views.decorators.cache import never_cache
 
+# The health payload never changes, so encode it once instead of
+# serializing a fresh dict on every load-balancer probe.
+_HEALTH_BODY = b'{"ok": true, "service": "fanart-backend"}'
 
+
+@never_cache
 def _health(request):
-    return JsonResponse({'ok': True, 'service': 'fanart-backend'})
+    return HttpResponse(_HEALTH_BODY, content_type='application/json')
 
 
 urlpatterns = [
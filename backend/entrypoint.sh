@@ -139,6 +139,19 @@ if [ -n "${TEMP_BIND_PID:-}" ]; then
   sleep 1
 fi
 
+# Opt-in ASGI mode: SERVER_MODE=asgi serves backend.asgi via Uvicorn. Only
+# useful once async views exist: every current (sync DRF) view runs on
+# Django's single thread-sensitive executor thread under ASGI, so this is
+# less concurrent than gunicorn's --threads. Keep the default (wsgi).
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+  echo "Starting Uvicorn (ASGI)..."
+  exec uvicorn backend.asgi:application \
+    --host 0.0.0.0 \
+    --port ${BIND_PORT} \
+    --workers "$WORKERS" \
+    --log-level info
+fi
+
 exec gunicorn backend.wsgi:application \
   --bind 0.0.0.0:${BIND_PORT} \
   --workers "$WORKERS" \
@@ -0,0 +1,31 @@
+from django.db import models
+from django.db.models.fields.json import KeyTransform
+
+try:
+    import orjson
+    HAVE_ORJSON = True
+except Exception:
+    HAVE_ORJSON = False
+
+
+class OrjsonJSONField(models.JSONField):
+    """JSONField that decodes column values with orjson when available.
+
+    Every Item load decodes `titles`/`characters`/`tags`; orjson does this
+    several times faster than the stdlib decoder used by JSONField. Falls
+    back to the stock behaviour when orjson isn't installed or a custom
+    decoder is configured.
+    """
+
+    def from_db_value(self, value, expression, connection):
+        if not HAVE_ORJSON or self.decoder is not None:
+            return super().from_db_value(value, expression, connection)
+        if value is None:
+            return value
+        # Some backends extract non-string values for key transforms
+        if isinstance(expression, KeyTransform) and not isinstance(value, str):
+            return value
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            return value
@@ -16,58 +16,284 @@ Usage example:
 The script returns a JSON array of discovered URLs.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
+import atexit
 import json
+import os
+import threading
+import time
 
-def fetch_rendered_media(url: str, browser_name: str = 'chromium', headless: bool = True, timeout: int = 30000) -> List[str]:
-    """Render the page and extract media URLs under #react-root.
+try:
+    from playwright.sync_api import sync_playwright
+    HAVE_PLAYWRIGHT = True
+except Exception:
+    HAVE_PLAYWRIGHT = False
 
-    Returns a list of unique URLs (strings). Requires Playwright to be
-    installed in the running environment.
+# System Chrome/Brave binary to prefer over the bundled Chromium, if installed.
+# Installed binaries don't move during the process lifetime, so probe once.
+_CHROME_PATHS = ['/usr/bin/google-chrome-stable', '/usr/bin/google-chrome', '/usr/bin/chrome', '/usr/bin/brave-browser', '/usr/bin/brave']
+_CHROME_EXE = next((p for p in _CHROME_PATHS if os.path.exists(p)), None)
+
+# Warm Playwright driver/browser/context per thread (see `_get_context`)
+_LOCAL = threading.local()
+# Sync Playwright keeps an event loop marked as running on the thread that
+# started it, and Django refuses ORM calls on such a thread. So all browser
+# work runs on dedicated worker threads (see `run_in_browser_thread`) and
+# request threads never own a loop.
+_WORKERS = int(os.environ.get('PLAYWRIGHT_WORKERS', '1') or 1)
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+# Every driver and browser launched by this module, closed at interpreter exit
+_LAUNCHED = []
+_LAUNCHED_LOCK = threading.Lock()
+
+# Short-lived cache of rendered results: (url, browser_name) -> (expires, urls)
+_RESULT_TTL = 60
+_RESULT_CACHE_MAX = 256
+_RESULT_CACHE = {}
+_RESULT_LOCK = threading.Lock()
+
+# Twitter/X attaches at most four photos to a tweet
+_MAX_PHOTO_PAGES = 4
+
+# Resource types the renderer never needs to download
+_BLOCKED_RESOURCE_TYPES = frozenset(('image', 'media', 'font'))
+
+# True once the page has rendered at least one Twitter/Pixiv media image
+_HAS_MEDIA_JS = "() => !!document.querySelector('img[src*=\"pbs.twimg.com\"], img[src*=\"pximg.net\"]')"
+
+# True once the <img> count is unchanged since the previous poll
+_IMG_COUNT_STABLE_JS = r"""
+() => {
+  const n = document.images.length;
+  const prev = window.__fvImgCount;
+  window.__fvImgCount = n;
+  return prev === n;
+}
+"""
+
+# Shared URL collectors, injected once per context via add_init_script so the
+# initial pass and the media-modal pass run the same code. Resolved
+# background-images are memoized per element; a MutationObserver drops the
+# entry when an element's style/class changes, so re-running the collector
+# after the modal opens only resolves styles for new or changed nodes.
+_COLLECTOR_INIT_JS = r"""
+(() => {
+  const BG_SELECTOR = '[style*="background-image"], [class*="Background"], figure, div[aria-label]';
+  const bgCache = new WeakMap();
+  let observer = null;
+  const watch = () => {
+    if (observer || !document.documentElement) return;
+    observer = new MutationObserver(records => {
+      records.forEach(r => bgCache.delete(r.target));
+    });
+    observer.observe(document.documentElement, {subtree: true, attributes: true, attributeFilter: ['style', 'class']});
+  };
+  const bgUrl = el => {
+    if (bgCache.has(el)) return bgCache.get(el);
+    let url = null;
+    try {
+      const s = window.getComputedStyle(el).getPropertyValue('background-image');
+      if (s && s !== 'none') {
+        const m = s.match(/url\((?:"|')?(.*?)(?:"|')?\)/);
+        if (m && m[1] && !m[1].startsWith('data:')) url = m[1];
+      }
+    } catch(e) {}
+    bgCache.set(el, url);
+    return url;
+  };
+  // background-image URLs under `root` (only on likely candidates; resolving
+  // styles for every node is the most expensive step)
+  window.__collectBackgroundUrls = (root, filter) => {
+    watch();
+    const urls = new Set();
+    (root || document).querySelectorAll(BG_SELECTOR).forEach(el => {
+      const u = bgUrl(el);
+      if (u && (!filter || u.includes(filter))) urls.add(u);
+    });
+    return Array.from(urls);
+  };
+  // <img> and background-image URLs across the whole document matching `filter`
+  window.__collectPbsUrls = filter => {
+    const urls = new Set();
+    document.querySelectorAll('img').forEach(im => {
+      const s = im.src || '';
+      if (s && !s.startsWith('data:') && (!filter || s.includes(filter))) urls.add(s);
+    });
+    window.__collectBackgroundUrls(document, filter).forEach(u => urls.add(u));
+    return Array.from(urls);
+  };
+})();
+"""
+
+# src (or data-src) of every element matched by eval_on_selector_all
+_SRC_ATTRS_JS = "els => els.map(e => e.getAttribute('src') || e.getAttribute('data-src'))"
+
+# Extract pbs urls from the whole document (covers the media modal)
+_MODAL_JS = "() => window.__collectPbsUrls('pbs.twimg.com')"
+
+
+def _abort_heavy_resources(route):
+    if route.request.resource_type in _BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+def _mark_worker():
+    _LOCAL.is_worker = True
+
+
+def run_in_browser_thread(fn, *args, **kwargs):
+    """Call `fn(*args, **kwargs)` on a Playwright worker thread and return
+    its result (or raise its exception).
+
+    Calls made from a worker already (e.g. the pixiv helper falling back to
+    the renderer) run inline, so nesting can't deadlock the pool.
     """
-    try:
-        from playwright.sync_api import sync_playwright
-    except Exception as e:
-        raise RuntimeError('Playwright not installed; run `pip install playwright`') from e
+    global _EXECUTOR
+    if getattr(_LOCAL, 'is_worker', False):
+        return fn(*args, **kwargs)
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            _EXECUTOR = ThreadPoolExecutor(max_workers=max(1, _WORKERS), thread_name_prefix='playwright', initializer=_mark_worker)
+    return _EXECUTOR.submit(fn, *args, **kwargs).result()
+
+
+def get_browser(browser_name: str = 'chromium', headless: bool = True):
+    """Return a warm browser for the calling Playwright worker thread.
+
+    The browser is launched on first use and then reused by later calls so
+    each render skips the browser cold start. Sync Playwright objects may
+    only be used from the thread that created them, so the cache is kept
+    per worker thread. Only call this from code run through
+    `run_in_browser_thread`. Callers open their own contexts on it and
+    close them when done.
+    """
+    if not getattr(_LOCAL, 'is_worker', False):
+        raise RuntimeError('get_browser must run on a Playwright worker thread (see run_in_browser_thread)')
+    browsers = getattr(_LOCAL, 'browsers', None)
+    if browsers is None:
+        browsers = _LOCAL.browsers = {}
+    key = (browser_name, headless)
+    browser = browsers.get(key)
+    if browser is not None and browser.is_connected():
+        return browser
 
-    import os
-    with sync_playwright() as p:
-      browser_ctor = getattr(p, browser_name, None)
-      if browser_ctor is None:
+    pw = getattr(_LOCAL, 'playwright', None)
+    if pw is None:
+        pw = _LOCAL.playwright = sync_playwright().start()
+        with _LAUNCHED_LOCK:
+            _LAUNCHED.append(pw)
+    browser_ctor = getattr(pw, browser_name, None)
+    if browser_ctor is None:
         raise RuntimeError(f'Unsupported browser: {browser_name}')
-      # Launch browser with some flags to reduce automation detection surface
-      launch_args = [
+    # Launch browser with some flags to reduce automation detection surface
+    launch_args = [
         '--disable-blink-features=AutomationControlled',
         '--disable-dev-shm-usage',
-      ]
-      # If a system Chrome/Brave binary exists in common locations, prefer it
-      chrome_paths = ['/usr/bin/google-chrome-stable', '/usr/bin/google-chrome', '/usr/bin/chrome', '/usr/bin/brave-browser', '/usr/bin/brave']
-      chrome_exe = next((p for p in chrome_paths if os.path.exists(p)), None)
-      if chrome_exe and browser_name == 'chromium':
+    ]
+    # If a system Chrome/Brave binary exists in common locations, prefer it
+    if _CHROME_EXE and browser_name == 'chromium':
         try:
-          browser = browser_ctor.launch(headless=headless, args=launch_args, executable_path=chrome_exe)
+            browser = browser_ctor.launch(headless=headless, args=launch_args, executable_path=_CHROME_EXE)
         except Exception:
-          # fallback to bundled
-          browser = browser_ctor.launch(headless=headless, args=launch_args)
-      else:
+            # fallback to bundled
+            browser = browser_ctor.launch(headless=headless, args=launch_args)
+    else:
         browser = browser_ctor.launch(headless=headless, args=launch_args)
-      # Create a context that resembles a regular Chrome/Brave environment
-      ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
-      context = browser.new_context(
+    with _LAUNCHED_LOCK:
+        _LAUNCHED.append(browser)
+    browsers[key] = browser
+    return browser
+
+
+def _get_context(browser_name: str, headless: bool):
+    """Return the warm media-collecting context for the calling thread."""
+    contexts = getattr(_LOCAL, 'contexts', None)
+    if contexts is None:
+        contexts = _LOCAL.contexts = {}
+    key = (browser_name, headless)
+    context = contexts.get(key)
+    if context is not None and context.browser is not None and context.browser.is_connected():
+        return context
+
+    browser = get_browser(browser_name, headless)
+    # Create a context that resembles a regular Chrome/Brave environment
+    ua = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+    context = browser.new_context(
         user_agent=ua,
         locale='ja-JP',
         timezone_id='Asia/Tokyo',
         viewport={'width': 1280, 'height': 800},
-      )
-      # Try to mask the webdriver flag
-      try:
+    )
+    # Try to mask the webdriver flag
+    try:
         context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-      except Exception:
+    except Exception:
+        pass
+    context.add_init_script(_COLLECTOR_INIT_JS)
+    # We only collect media URLs (src/srcset/background-image strings stay in
+    # the DOM either way), so don't spend time downloading the bytes.
+    try:
+        context.route('**/*', _abort_heavy_resources)
+    except Exception:
         pass
-      page = context.new_page()
+    contexts[key] = context
+    return context
+
 
+@atexit.register
+def _shutdown():
+    """Close any browsers (and Playwright drivers) launched by this module."""
+    with _LAUNCHED_LOCK:
+        launched = list(reversed(_LAUNCHED))
+        _LAUNCHED.clear()
+    for obj in launched:
+        try:
+            (getattr(obj, 'stop', None) or obj.close)()
+        except Exception:
+            pass
+
+
+def fetch_rendered_media(url: str, browser_name: str = 'chromium', headless: bool = True, timeout: int = 30000) -> List[str]:
+    """Render the page and extract media URLs under #react-root.
+
+    Returns a list of unique URLs (strings). Requires Playwright to be
+    installed in the running environment. Non-empty results are cached per
+    (url, browser_name) for `_RESULT_TTL` seconds so repeated requests for
+    the same page don't pay for another multi-second render.
+    """
+    if not HAVE_PLAYWRIGHT:
+        raise RuntimeError('Playwright not installed; run `pip install playwright`')
+
+    key = (url, browser_name)
+    now = time.monotonic()
+    with _RESULT_LOCK:
+        hit = _RESULT_CACHE.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                return list(hit[1])
+            del _RESULT_CACHE[key]
+
+    urls = run_in_browser_thread(_render_media, url, browser_name, headless, timeout)
+    if urls:
+        with _RESULT_LOCK:
+            _RESULT_CACHE.pop(key, None)
+            _RESULT_CACHE[key] = (now + _RESULT_TTL, tuple(urls))
+            # dicts keep insertion order, so the first key is the oldest
+            while len(_RESULT_CACHE) > _RESULT_CACHE_MAX:
+                del _RESULT_CACHE[next(iter(_RESULT_CACHE))]
+    return urls
+
+
+def _render_media(url: str, browser_name: str, headless: bool, timeout: int) -> List[str]:
+    context = _get_context(browser_name, headless)
+    page = context.new_page()
+    try:
       try:
-        page.goto(url, wait_until='networkidle', timeout=timeout)
+        page.goto(url, wait_until='domcontentloaded', timeout=timeout)
       except Exception:
         # fallback: try waiting for selector; if that also fails, continue
         try:
@@ -75,11 +301,18 @@ def fetch_rendered_media(url: str, browser_name: str = 'chromium', headless: boo
         except Exception:
           pass
 
-      # perform gentle scrolls to trigger lazy-loading images
+      # wait for the app to render its first media image rather than for the
+      # network to go idle (which long-polling pages rarely reach)
+      try:
+        page.wait_for_function(_HAS_MEDIA_JS, timeout=5000)
+      except Exception:
+        pass
+
+      # scroll to the bottom once to trigger lazy-loading images, then wait
+      # until the number of images stops changing between polls
       try:
-        for y in (200, 600, 1000, 1400):
-          page.evaluate(f"window.scrollTo(0, {y})")
-          page.wait_for_timeout(600)
+        page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        page.wait_for_function(_IMG_COUNT_STABLE_JS, polling=300, timeout=3000)
       except Exception:
         pass
 
@@ -108,31 +341,14 @@ def fetch_rendered_media(url: str, browser_name: str = 'chromium', headless: boo
             if (ds && !ds.startsWith('data:')) urls.add(ds);
           });
 
-          // collect background-image from computed styles
-          root.querySelectorAll('*').forEach(el => {
-            try {
-              const s = window.getComputedStyle(el).getPropertyValue('background-image');
-              if (s && s !== 'none') {
-                const m = s.match(/url\((?:"|')?(.*?)(?:"|')?\)/);
-                if (m && m[1] && !m[1].startsWith('data:')) urls.add(m[1]);
-              }
-            } catch(e) {}
-          });
+          // collect background-image from computed styles (shared collector
+          // injected by _COLLECTOR_INIT_JS; also covers anchors to /photo/)
+          window.__collectBackgroundUrls(root).forEach(u => urls.add(u));
 
           // anchors linking to /photo/ may wrap images
           root.querySelectorAll('a[href*="/photo/"]').forEach(a => {
             const im = a.querySelector('img');
             if (im && im.src && !im.src.startsWith('data:')) urls.add(im.src);
-            // also check background-image inside anchor
-            a.querySelectorAll('*').forEach(el => {
-              try {
-                const s = window.getComputedStyle(el).getPropertyValue('background-image');
-                if (s && s !== 'none') {
-                  const m = s.match(/url\((?:"|')?(.*?)(?:"|')?\)/);
-                  if (m && m[1] && !m[1].startsWith('data:')) urls.add(m[1]);
-                }
-              } catch(e) {}
-            });
           });
 
           return Array.from(urls);
@@ -143,6 +359,8 @@ def fetch_rendered_media(url: str, browser_name: str = 'chromium', headless: boo
         urls = page.evaluate(js)
       except Exception:
         urls = []
+      # keep insertion order but dedupe with O(1) lookups (dict as ordered set)
+      urls = dict.fromkeys(urls or [])
 
       # If not much found, try broader selectors and clicking different elements
       if not urls or len(urls) < 2:
@@ -154,14 +372,12 @@ def fetch_rendered_media(url: str, browser_name: str = 'chromium', headless: boo
         ]
         for sel in extra_selectors:
           try:
+            # read src/data-src of every match in one evaluate instead of
+            # two get_attribute round trips per element
+            for src in page.eval_on_selector_all(sel, _SRC_ATTRS_JS) or []:
+              if src and not src.startswith('data:'):
+                urls[src] = None
             els = page.query_selector_all(sel)
-            for el in els:
-              try:
-                src = el.get_attribute('src') or el.get_attribute('data-src')
-                if src and not src.startswith('data:') and src not in urls:
-                  urls.append(src)
-              except Exception:
-                continue
             # click parent to try opening viewer if present
             for el in els:
               try:
@@ -170,8 +386,8 @@ def fetch_rendered_media(url: str, browser_name: str = 'chromium', headless: boo
                 # extract pbs images after click
                 pbs_found = page.evaluate(r"() => Array.from(document.querySelectorAll('img')).map(i=>i.src).filter(s=>s && s.includes('pbs.twimg.com'))")
                 for u in pbs_found:
-                  if u and u not in urls:
-                    urls.append(u)
+                  if u:
+                    urls[u] = None
                 try:
                   page.keyboard.press('Escape')
                   page.wait_for_timeout(200)
@@ -183,68 +399,56 @@ def fetch_rendered_media(url: str, browser_name: str = 'chromium', headless: boo
             continue
 
       # If we only found small assets (emoji/SVG) or want to be thorough,
-      # try clicking gallery anchors (links to /photo/) to open the media
-      # viewer/modal and collect full-size `pbs.twimg.com` images.
+      # open each gallery anchor (links to /photo/) in its own tab so the
+      # media viewers load concurrently instead of one click at a time, then
+      # collect full-size `pbs.twimg.com` images from every tab.
+      try:
+        hrefs = page.eval_on_selector_all('a[href*="/photo/"]', 'els => els.map(a => a.href)')
+      except Exception:
+        hrefs = []
+      photo_pages = []
       try:
-        anchors = page.query_selector_all('a[href*="/photo/"]')
-        for i, a in enumerate(anchors):
+        for href in list(dict.fromkeys(hrefs or []))[:_MAX_PHOTO_PAGES]:
           try:
-            # click the thumbnail to open modal
-            a.click()
-            # give the modal a short time to appear and load
-            page.wait_for_timeout(500)
-            # wait for an image likely from pbs.twimg to appear in modal
-            try:
-              page.wait_for_selector('img[src*="pbs.twimg.com"]', timeout=3000)
-            except Exception:
-              # if not found, continue but still attempt to extract
-              pass
-            # extract pbs urls from the whole document (covers modal)
-            modal_js = r"""
-            () => {
-              const urls = new Set();
-              document.querySelectorAll('img').forEach(im => {
-                try {
-                  const s = im.src || '';
-                  if (s.includes('pbs.twimg.com') && !s.startsWith('data:')) urls.add(s);
-                } catch(e) {}
-              });
-              // also check computed background-images
-              document.querySelectorAll('*').forEach(el => {
-                try {
-                  const s = window.getComputedStyle(el).getPropertyValue('background-image');
-                  if (s && s !== 'none') {
-                    const m = s.match(/url\((?:"|')?(.*?)(?:"|')?\)/);
-                    if (m && m[1] && m[1].includes('pbs.twimg.com')) urls.add(m[1]);
-                  }
-                } catch(e) {}
-              });
-              return Array.from(urls);
-            }
-            """
-            try:
-              pbs = page.evaluate(modal_js)
-            except Exception:
-              pbs = []
-            for u in (pbs or []):
-              if u and u not in urls:
-                urls.append(u)
-            # close the modal if possible (Escape key)
-            try:
-              page.keyboard.press('Escape')
-              page.wait_for_timeout(200)
-            except Exception:
-              pass
+            pp = context.new_page()
+            photo_pages.append(pp)
+            # 'commit' returns as soon as navigation starts, so the tabs
+            # keep loading in parallel while we move on to the next one
+            pp.goto(href, wait_until='commit', timeout=timeout)
           except Exception:
             continue
+        # all tabs share a single wait budget for the modal image to appear
+        deadline = time.monotonic() + 3.0
+        for pp in photo_pages:
+          try:
+            remaining = max(0, deadline - time.monotonic())
+            pp.wait_for_selector('img[src*="pbs.twimg.com"]', timeout=int(remaining * 1000) or 1)
+          except Exception:
+            # if not found, continue but still attempt to extract
+            pass
+          try:
+            pbs = pp.evaluate(_MODAL_JS)
+          except Exception:
+            pbs = []
+          for u in (pbs or []):
+            if u:
+              urls[u] = None
       except Exception:
         # don't fail if this enhancement errors
         pass
+      finally:
+        for pp in photo_pages:
+          try:
+            pp.close()
+          except Exception:
+            pass
+      return list(urls)
+    finally:
+      # close only the page; the browser and context stay warm for reuse
       try:
-        browser.close()
+        page.close()
       except Exception:
         pass
-      return list(dict.fromkeys(urls))
 
 
 def main():
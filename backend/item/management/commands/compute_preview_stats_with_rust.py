@@ -4,6 +4,15 @@ import os
 import json
 from django.conf import settings
 
+try:
+    # Optional in-process build of rust_worker (PyO3 extension module). When
+    # importable it avoids spawning the binary and round-tripping via JSON.
+    import rust_worker
+    HAVE_RUST_EXT = hasattr(rust_worker, 'compute_preview_sizes')
+except Exception:
+    rust_worker = None
+    HAVE_RUST_EXT = False
+
 
 class Command(BaseCommand):
     help = "Call rust_worker to compute preview image sizes for an item"
@@ -11,7 +20,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument('--item-id', type=int, required=True)
         parser.add_argument('--db-url', type=str, required=False, help='Optional DATABASE_URL override')
-        parser.add_argument('--bin', type=str, required=False, help='Path to rust_worker binary (defaults to rust_worker/target/release/rust_worker)')
+        parser.add_argument('--bin', type=str, required=False, help='Path to rust_worker binary (defaults to rust_worker/target/release/rust_worker); unused when the rust_worker extension module is importable')
 
     def handle(self, *args, **options):
         item_id = options['item_id']
@@ -22,6 +31,16 @@ class Command(BaseCommand):
             self.stderr.write('DATABASE_URL not set and --db-url not provided')
             return
 
+        if HAVE_RUST_EXT:
+            try:
+                parsed = rust_worker.compute_preview_sizes(item_id, db_url)
+            except Exception as e:
+                self.stderr.write('Rust worker failed:')
+                self.stderr.write(str(e))
+                return
+            self.stdout.write(json.dumps(parsed, indent=2))
+            return
+
         if not os.path.exists(bin_path):
             self.stderr.write(f'Binary not found at {bin_path}. Build with `cargo build --release` in rust_worker/`')
             return
@@ -1,53 +1,121 @@
 from django.core.management.base import BaseCommand
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from urllib.parse import urlparse
+from urllib.request import HTTPSHandler, Request, build_opener
+import atexit
+import json
 import re
 import os
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
     HAVE_REQUESTS = True
 except Exception:
     HAVE_REQUESTS = False
 
+_USER_AGENT = 'fanart-viewer-debug/1.0'
 
+# One pooled keep-alive session for every candidate/variant fetch; most of
+# them hit the same pixiv host, so this skips a TCP+TLS handshake per URL.
+if HAVE_REQUESTS:
+    _SESSION = requests.Session()
+    _adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20)
+    _SESSION.mount('https://', _adapter)
+    _SESSION.mount('http://', _adapter)
+    _SESSION.headers['User-Agent'] = _USER_AGENT
+    atexit.register(_SESSION.close)
+else:
+    _SESSION = None
+
+# urllib fallback: build the opener once instead of per call
+_OPENER = build_opener(HTTPSHandler())
+
+# ETag/Last-Modified per URL from earlier runs, so reruns can send a
+# conditional GET and get a bodiless 304 for images that haven't changed
+_ETAG_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'fanart_viewer', 'etags.json')
+_ETAGS = {}
+
+
+def _load_etags():
+    try:
+        with open(_ETAG_CACHE_PATH, 'r', encoding='utf-8') as f:
+            _ETAGS.update(json.load(f))
+    except Exception:
+        pass
+
+
+def _save_etags():
+    try:
+        os.makedirs(os.path.dirname(_ETAG_CACHE_PATH), exist_ok=True)
+        with open(_ETAG_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(_ETAGS, f)
+    except Exception:
+        pass
+
+
+# pixiv master -> original URL rewrites, compiled once at import
+_RE_C_PREFIX = re.compile(r'^/c/\d+x\d+/img-master')
+_RE_MASTER = re.compile(r'_master\d+(?=\.)')
+_RE_P_MASTER = re.compile(r'(_p\d+)_master\d+')
+# page-number slot of a _p0 URL, for building the p0..p9 template
+_RE_P0_PAGE = re.compile(r'(_p)0')
+
+
+_PIXIV_SUFFIXES = ('pixiv.net', 'pximg.net')
+
+
+@lru_cache(maxsize=128)
 def _is_pixiv_host(hostname):
-    return hostname and ('pixiv' in hostname or 'pximg' in hostname or 'i.pximg.net' in hostname)
+    # hostnames repeat across candidates and p-variants, hence the cache
+    return bool(hostname) and hostname.endswith(_PIXIV_SUFFIXES)
 
 
 def make_pixiv_original_candidate(url):
     try:
-        from urllib.parse import urlparse
         p = urlparse(url)
         net = p.netloc
         if not _is_pixiv_host(net):
             return url
         path = p.path
-        path = re.sub(r'^/c/\d+x\d+/img-master', '/img-master', path)
+        path = _RE_C_PREFIX.sub('/img-master', path)
         path = path.replace('/img-master/', '/img-original/')
-        path = re.sub(r'_master\d+(?=\.)', '', path)
-        path = re.sub(r'(_p\d+)_master\d+', r'\1', path)
+        path = _RE_MASTER.sub('', path)
+        path = _RE_P_MASTER.sub(r'\1', path)
         return f"{p.scheme}://{p.netloc}{path}"
     except Exception:
         return url
 
 
-def _fetch(uurl, extra_headers=None, timeout=12):
-    headers = {'User-Agent': 'fanart-viewer-debug/1.0'}
+def _fetch(uurl, extra_headers=None, timeout=12, conditional=False):
+    headers = {'User-Agent': _USER_AGENT}
     if extra_headers:
         headers.update(extra_headers)
     if HAVE_REQUESTS:
+        cached = _ETAGS.get(uurl) if conditional else None
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
         try:
-            r = requests.get(uurl, headers=headers, timeout=timeout, allow_redirects=True)
+            r = _SESSION.get(uurl, headers=headers, timeout=timeout, allow_redirects=True)
             ct = r.headers.get('content-type', '')
+            if r.status_code == 200 and (r.headers.get('ETag') or r.headers.get('Last-Modified')):
+                _ETAGS[uurl] = {
+                    'etag': r.headers.get('ETag'),
+                    'last_modified': r.headers.get('Last-Modified'),
+                    'size': len(r.content),
+                }
             return r.status_code, r.content, ct, dict(r.headers)
         except Exception as e:
             return None, None, None, {'error': str(e)}
     else:
         # fallback to urllib
         try:
-            from urllib.request import Request, urlopen
             req = Request(uurl, headers=headers)
-            with urlopen(req, timeout=timeout) as resp:
+            with _OPENER.open(req, timeout=timeout) as resp:
                 info = resp.info()
                 try:
                     ct = info.get_content_type()
@@ -78,15 +146,16 @@ class Command(BaseCommand):
         self.stdout.write(self.style.NOTICE(f'Debug fetch for: {url}'))
 
         parsed = urlparse(url)
+        is_pixiv = _is_pixiv_host(parsed.netloc)
         extra = {}
         if referer:
             extra['Referer'] = referer
-        elif _is_pixiv_host(parsed.netloc):
+        elif is_pixiv:
             extra['Referer'] = 'https://www.pixiv.net/'
 
         # First, if pixiv host, try transformed original candidate
         tried = []
-        if _is_pixiv_host(parsed.netloc):
+        if is_pixiv:
             orig = make_pixiv_original_candidate(url)
             if orig and orig != url:
                 self.stdout.write(f'Trying pixiv original candidate: {orig}')
@@ -95,16 +164,24 @@ class Command(BaseCommand):
         # primary URL
         tried.append(url)
 
+        # Revalidate against ETags from earlier runs, unless the body is
+        # needed for --save-first (a 304 carries no body)
+        conditional = not save_first
+        if conditional:
+            _load_etags()
+
         first_saved = False
         for cand in tried:
             self.stdout.write(f'Fetching: {cand}')
-            status, data, ct, hdrs = _fetch(cand, extra)
+            status, data, ct, hdrs = _fetch(cand, extra, conditional=conditional)
             if status is None:
                 self.stdout.write(self.style.ERROR(f'Failed: {hdrs.get("error")}'))
                 continue
             size = len(data) if data else 0
             is_image = (ct and str(ct).startswith('image'))
             self.stdout.write(f'  status={status} content-type={ct} size={size}')
+            if status == 304:
+                self.stdout.write(f'  not modified since last run (cached size={_ETAGS.get(cand, {}).get("size")})')
             if save_first and not first_saved and is_image and size>0:
                 try:
                     with open(save_first, 'wb') as f:
@@ -113,27 +190,34 @@ class Command(BaseCommand):
                     first_saved = True
                 except Exception as e:
                     self.stdout.write(self.style.ERROR(f'Failed saving file: {e}'))
-            # If this is pixiv and we should try p-variants, and path contains _p0
-            if try_p_variants and _is_pixiv_host(urlparse(cand).netloc) and re.search(r'_p0(_|\.)', urlparse(cand).path):
-                base = re.sub(r'(_p)0', r'\1{}', cand)
-                for i in range(0, 10):
-                    purl = base.format(i)
-                    purl = make_pixiv_original_candidate(purl)
-                    self.stdout.write(f'  Trying page variant: {purl}')
-                    st2, d2, ct2, h2 = _fetch(purl, {'Referer': 'https://www.pixiv.net/'})
-                    if st2 is None:
-                        self.stdout.write(self.style.ERROR(f'    Failed: {h2.get("error")}'))
-                        continue
-                    size2 = len(d2) if d2 else 0
-                    is_img2 = (ct2 and str(ct2).startswith('image'))
-                    self.stdout.write(f'    status={st2} content-type={ct2} size={size2}')
-                    if save_first and not first_saved and is_img2 and size2>0:
-                        try:
-                            with open(save_first, 'wb') as f:
-                                f.write(d2)
-                            self.stdout.write(self.style.SUCCESS(f'Saved first image to {save_first}'))
-                            first_saved = True
-                        except Exception as e:
-                            self.stdout.write(self.style.ERROR(f'Failed saving file: {e}'))
-
+            # If this is pixiv and we should try p-variants, and path contains _p0.
+            # Every candidate shares the host of `url` (the original candidate
+            # only rewrites the path), so a substring test is enough here.
+            if try_p_variants and is_pixiv and ('_p0.' in cand or '_p0_' in cand):
+                base = _RE_P0_PAGE.sub(r'\1{}', cand)
+                purls = [make_pixiv_original_candidate(base.format(i)) for i in range(0, 10)]
+                # variants are independent GETs; fetch them concurrently through
+                # the shared session and report them in page order
+                with ThreadPoolExecutor(max_workers=len(purls)) as ex:
+                    results = ex.map(lambda u: _fetch(u, {'Referer': 'https://www.pixiv.net/'}, conditional=conditional), purls)
+                    for purl, (st2, d2, ct2, h2) in zip(purls, results):
+                        self.stdout.write(f'  Trying page variant: {purl}')
+                        if st2 is None:
+                            self.stdout.write(self.style.ERROR(f'    Failed: {h2.get("error")}'))
+                            continue
+                        size2 = len(d2) if d2 else 0
+                        is_img2 = (ct2 and str(ct2).startswith('image'))
+                        self.stdout.write(f'    status={st2} content-type={ct2} size={size2}')
+                        if st2 == 304:
+                            self.stdout.write(f'    not modified since last run (cached size={_ETAGS.get(purl, {}).get("size")})')
+                        if save_first and not first_saved and is_img2 and size2>0:
+                            try:
+                                with open(save_first, 'wb') as f:
+                                    f.write(d2)
+                                self.stdout.write(self.style.SUCCESS(f'Saved first image to {save_first}'))
+                                first_saved = True
+                            except Exception as e:
+                                self.stdout.write(self.style.ERROR(f'Failed saving file: {e}'))
+
+        _save_etags()
         self.stdout.write(self.style.SUCCESS('Debug fetch finished'))
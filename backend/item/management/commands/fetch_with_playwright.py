@@ -1,5 +1,6 @@
 import os
 from django.core.management.base import BaseCommand
+from django.db import transaction
 
 try:
     from playwright.sync_api import sync_playwright
@@ -8,7 +9,6 @@ except Exception:
     HAVE_PLAYWRIGHT = False
 
 import base64
-import threading
 
 from item.models import Item, PreviewImage
 from item.playwright_helper import fetch_images_with_playwright
@@ -73,7 +73,9 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.NOTICE(f'Playwright reported logged_in={logged}; fetched {len(images)} image(s)'))
 
-        collected = []
+        # keep only the largest image seen so far instead of every body
+        best = None
+        best_size = -1
         # images are tuples (idx, body, content_type, url)
         for entry in images:
             if not entry or len(entry) < 4:
@@ -82,24 +84,30 @@ class Command(BaseCommand):
             size = len(body) if body else 0
             self.stdout.write(self.style.NOTICE(f'Image idx={idx} size={size} bytes content_type={content_type} url={url_f}'))
             if item_id and it is not None:
-                collected.append((idx, body, content_type, url_f))
+                if size > best_size:
+                    best = (idx, body, content_type, url_f)
+                    best_size = size
             else:
                 fname = f'/tmp/pw_fetched_{idx}.bin'
                 with open(fname, 'wb') as f:
                     f.write(body)
                 self.stdout.write(self.style.SUCCESS(f'Saved to {fname}'))
 
-            # Now perform synchronous DB writes (after browser is closed) to avoid async context issues
-            if item_id and it is not None:
-                def _write():
-                    PreviewImage.objects.filter(item=it).delete()
-                    # pick the best (largest-bytes) image and save only that as order=0
-                    best = max(collected, key=lambda t: len(t[1]) if t and t[1] else 0)
-                    _, body, content_type, url_f = best
-                    PreviewImage.objects.create(item=it, order=0, data=body, content_type=content_type)
-                t = threading.Thread(target=_write)
-                t.start()
-                t.join()
-                self.stdout.write(self.style.SUCCESS(f'Saved 1 PreviewImage for Item id={item_id}'))
-            else:
-                self.stdout.write(self.style.SUCCESS('Done (saved files to /tmp)'))
+        if not (item_id and it is not None):
+            self.stdout.write(self.style.SUCCESS('Done (saved files to /tmp)'))
+            return
+        if best is None:
+            self.stderr.write(self.style.ERROR('No images fetched'))
+            return
+
+        # Perform the DB write once, after every image has been fetched. The
+        # browser runs on the helper's worker thread, so this thread has no
+        # Playwright event loop and the ORM is usable here. The delete+create
+        # is a single transaction so the item never shows up without a
+        # preview in between.
+        # save only the best (largest-bytes) image as order=0
+        _, body, content_type, url_f = best
+        with transaction.atomic():
+            PreviewImage.objects.filter(item=it).delete()
+            PreviewImage.objects.create(item=it, order=0, data=body, content_type=content_type)
+        self.stdout.write(self.style.SUCCESS(f'Saved 1 PreviewImage for Item id={item_id}'))
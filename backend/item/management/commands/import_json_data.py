@@ -1,10 +1,46 @@
 import json
-import glob
 import os
 
+try:
+    # Rust-backed parser, several times faster than json for large files
+    import orjson
+    _loads = orjson.loads
+except Exception:
+    _loads = json.loads
+
+try:
+    import ijson
+    HAVE_IJSON = True
+except Exception:
+    HAVE_IJSON = False
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from item.models import Item
 
+# fields refreshed from the JSON when an (external_id, source) row already exists
+# updated_at is listed so upserted rows bump the item list ETag
+UPDATE_FIELDS = ['situation', 'titles', 'characters', 'artist', 'link', 'tags', 'updated_at']
+# entries upserted per bulk_create statement
+BATCH_SIZE = 1000
+
+
+def _iter_entries(path):
+    """Yield (key, entry) pairs from a data file's top-level object.
+
+    With ijson the object is streamed so only one entry is in memory at a
+    time; otherwise the file is parsed in one go.
+    """
+    with open(path, 'rb') as f:
+        if HAVE_IJSON:
+            # use_float: JSONField can't serialize ijson's default Decimals
+            yield from ijson.kvitems(f, '', use_float=True)
+            return
+        data = _loads(f.read())
+    if not isinstance(data, dict):
+        raise ValueError('unexpected JSON root type')
+    yield from data.items()
+
 
 def normalize_entry(key, data):
     # key is string number
@@ -23,28 +59,31 @@ def normalize_entry(key, data):
 class Command(BaseCommand):
     help = 'Import JSON files from backend/data into DB (idempotent)'
     def handle(self, *args, **options):
-        # look for possible data directories and collect unique files (dedupe by realpath)
-        candidates = []
+        # look for possible data directories and collect unique files
         base_dirs = [
             '/app/data',
             os.path.join(os.getcwd(), 'data'),
             os.path.join(os.getcwd(), 'backend', 'data'),
         ]
-        for d in base_dirs:
-            if os.path.isdir(d):
-                candidates.extend(glob.glob(os.path.join(d, '*.json')))
-
-        # dedupe by resolved absolute path to avoid processing same file multiple times
+        # dedupe by (device, inode) to avoid processing the same file multiple
+        # times when data directories overlap or are symlinked
         resolved = []
         seen = set()
-        for p in candidates:
-            try:
-                rp = os.path.realpath(p)
-            except Exception:
-                rp = os.path.abspath(p)
-            if rp not in seen:
-                seen.add(rp)
-                resolved.append(p)
+        for d in base_dirs:
+            if not os.path.isdir(d):
+                continue
+            with os.scandir(d) as it:
+                for e in sorted(it, key=lambda e: e.name):
+                    if not e.name.endswith('.json') or not e.is_file():
+                        continue
+                    try:
+                        st = e.stat()
+                        key = (st.st_dev, st.st_ino)
+                    except OSError:
+                        key = os.path.realpath(e.path)
+                    if key not in seen:
+                        seen.add(key)
+                        resolved.append(e.path)
 
         if not resolved:
             self.stdout.write(self.style.WARNING('No JSON files found in expected data directories.'))
@@ -55,42 +94,76 @@ class Command(BaseCommand):
             self.stdout.write(f'Processing {path}...')
             # derive source from filename (basename without extension)
             src = os.path.splitext(os.path.basename(path))[0]
-            try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f'Failed to read {path}: {e}'))
-                total_errors += 1
-                continue
-
-            if not isinstance(data, dict):
-                self.stdout.write(self.style.WARNING(f'Skipped {path}: unexpected JSON root type'))
-                continue
-
             created = updated = errors = 0
-            for key, entry in data.items():
-                try:
-                    normalized = normalize_entry(key, entry)
-                    obj, was_created = Item.objects.update_or_create(
-                        external_id=normalized['external_id'],
-                        source=src,
-                        defaults={
-                            'situation': normalized['situation'],
-                            'titles': normalized['titles'],
-                            'characters': normalized['characters'],
-                            'artist': normalized['artist'],
-                            'link': normalized['link'],
-                            'tags': normalized['tags'],
-                            'source': src,
-                        }
-                    )
+            # keyed by external_id: ON CONFLICT can't touch one row twice in a
+            # statement, so a repeated id within a batch keeps the last entry
+            batch = {}
+            # Existing ids are fetched once up front only to report created vs
+            # updated counts.
+            existing = set(Item.objects.filter(source=src).values_list('external_id', flat=True))
+
+            def save_rows(objs):
+                # per-row fallback for a batch the upsert rejected, so one bad
+                # entry only costs itself
+                nonlocal created, updated, errors
+                for obj in objs:
+                    try:
+                        with transaction.atomic():
+                            _, was_created = Item.objects.update_or_create(
+                                external_id=obj.external_id,
+                                source=src,
+                                defaults={f: getattr(obj, f) for f in UPDATE_FIELDS if f != 'updated_at'},
+                            )
+                    except Exception as e:
+                        errors += 1
+                        self.stdout.write(self.style.ERROR(f'Failed to import {obj.external_id}: {e}'))
+                        continue
                     if was_created:
                         created += 1
                     else:
                         updated += 1
+
+            def flush():
+                nonlocal created, updated
+                if not batch:
+                    return
+                objs = list(batch.values())
+                batch.clear()
+                # Upsert with INSERT .. ON CONFLICT instead of a SELECT +
+                # INSERT/UPDATE per entry; each batch commits on its own
+                try:
+                    with transaction.atomic():
+                        Item.objects.bulk_create(
+                            objs,
+                            update_conflicts=True,
+                            unique_fields=['external_id', 'source'],
+                            update_fields=UPDATE_FIELDS,
+                        )
                 except Exception as e:
-                    errors += 1
-                    self.stdout.write(self.style.ERROR(f'Failed to import {key}: {e}'))
+                    self.stdout.write(self.style.ERROR(f'Batch upsert failed, retrying row by row: {e}'))
+                    save_rows(objs)
+                    return
+                for obj in objs:
+                    if obj.external_id in existing:
+                        updated += 1
+                    else:
+                        created += 1
+
+            try:
+                for key, entry in _iter_entries(path):
+                    try:
+                        normalized = normalize_entry(key, entry)
+                        batch[normalized['external_id']] = Item(source=src, **normalized)
+                    except Exception as e:
+                        errors += 1
+                        self.stdout.write(self.style.ERROR(f'Failed to import {key}: {e}'))
+                    if len(batch) >= BATCH_SIZE:
+                        flush()
+            except Exception as e:
+                # unreadable/truncated file; entries parsed so far are kept
+                errors += 1
+                self.stdout.write(self.style.ERROR(f'Failed to read {path}: {e}'))
+            flush()
 
             total_created += created
             total_updated += updated
@@ -1,11 +1,50 @@
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
 import json
-import base64
 import os
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+try:
+    # SIMD-accelerated drop-in for base64.b64decode
+    from pybase64 import b64decode as _b64decode
+    HAVE_PYBASE64 = True
+except Exception:
+    from base64 import b64decode as _b64decode
+    HAVE_PYBASE64 = False
+
+try:
+    import ijson
+    HAVE_IJSON = True
+except Exception:
+    HAVE_IJSON = False
 
 from item.models import Item, PreviewImage
 
+# PreviewImage rows written per delete+bulk_create round trip; kept modest
+# because every pending row holds a decoded image in memory
+FLUSH_EVERY = 100
+
+
+def _fixture_reader(path):
+    """Return a callable yielding the top-level objects of a dumpdata fixture.
+
+    With ijson each call re-parses the file incrementally, so only one object
+    (and its base64 payload) is held in memory at a time. Without it the
+    file is loaded once and every call iterates the same list.
+    """
+    if HAVE_IJSON:
+        def _stream():
+            with open(path, 'rb') as fh:
+                yield from ijson.items(fh, 'item')
+        return _stream
+    with open(path, 'rb') as fh:
+        data = json.load(fh)
+    return lambda: iter(data)
+
 
 class Command(BaseCommand):
     help = 'Restore PreviewImage and preview_data fields from a dumpdata JSON fixture'
@@ -22,26 +61,23 @@ class Command(BaseCommand):
             self.stderr.write(self.style.ERROR(f'Fixture not found: {path}'))
             return
 
-        with open(path, 'rb') as fh:
-            try:
-                data = json.load(fh)
-            except Exception as e:
-                self.stderr.write(self.style.ERROR(f'Failed to parse JSON: {e}'))
-                return
-
-        # Build mapping from old item PK -> fields dict
-        oldpk_to_fields = {}
-        for obj in data:
-            if obj.get('model', '').lower().endswith('item'):
-                pk = obj.get('pk')
-                fields = obj.get('fields', {})
-                oldpk_to_fields[pk] = fields
-
         restored_preview_images = 0
         restored_legacy_previews = 0
         skipped_missing = 0
         ambiguous = 0
 
+        # Index current items once so the per-entry lookups below are dict
+        # hits instead of up to four queries each. Only the key columns are
+        # loaded; the preview blobs are never needed for matching.
+        by_ext_src = defaultdict(list)
+        by_ext = defaultdict(list)
+        by_link = defaultdict(list)
+        for it in Item.objects.only('id', 'external_id', 'source', 'link').iterator(chunk_size=2000):
+            by_ext_src[(it.external_id, it.source)].append(it)
+            by_ext[it.external_id].append(it)
+            if it.link:
+                by_link[it.link].append(it)
+
         # helper: find single matching current Item using multiple heuristics
         def find_current_item(fields):
             ext = fields.get('external_id')
@@ -52,27 +88,27 @@ class Command(BaseCommand):
 
             # 1) exact external_id + source
             if ext and src:
-                qs = Item.objects.filter(external_id=ext, source=src)
-                if qs.count() == 1:
-                    return qs.first(), 'ext+src'
-                elif qs.count() > 1:
+                found = by_ext_src.get((ext, src), [])
+                if len(found) == 1:
+                    return found[0], 'ext+src'
+                elif len(found) > 1:
                     return None, 'ambiguous_ext_src'
 
             # 2) external_id alone
             if ext:
-                qs = Item.objects.filter(external_id=ext)
-                if qs.count() == 1:
-                    return qs.first(), 'ext'
-                elif qs.count() > 1:
+                found = by_ext.get(ext, [])
+                if len(found) == 1:
+                    return found[0], 'ext'
+                elif len(found) > 1:
                     # keep going to disambiguate with link/title
                     pass
 
             # 3) link exact match
             if link:
-                qs = Item.objects.filter(link=link)
-                if qs.count() == 1:
-                    return qs.first(), 'link'
-                elif qs.count() > 1:
+                found = by_link.get(link, [])
+                if len(found) == 1:
+                    return found[0], 'link'
+                elif len(found) > 1:
                     return None, 'ambiguous_link'
 
             # 4) match by title + artist (case-insensitive contains)
@@ -84,55 +120,130 @@ class Command(BaseCommand):
                 # but DRF/Django models may store titles as JSON; this is heuristic
                 if artist:
                     qs = qs.filter(artist__icontains=artist)
-                if qs.count() == 1:
-                    return qs.first(), 'title+artist'
-                elif qs.count() > 1:
+                # only the id is needed, and two rows are enough to tell
+                # unique from ambiguous: one small query instead of
+                # count() twice plus a full-row first()
+                found = list(qs.only('id')[:2])
+                if len(found) == 1:
+                    return found[0], 'title+artist'
+                elif len(found) > 1:
                     return None, 'ambiguous_title_artist'
 
             return None, 'not_found'
 
-        # We'll create PreviewImage rows from fixture previewimage entries
-        for obj in data:
-            model = obj.get('model', '').lower()
-            fields = obj.get('fields', {})
-            if model.endswith('previewimage'):
-                old_item_ref = fields.get('item')
-                order = fields.get('order') or 0
-                b64data = fields.get('data')
-                content_type = fields.get('content_type')
-
-                if b64data is None:
-                    continue
-
-                # find original item fields and then current Item
-                old_fields = oldpk_to_fields.get(old_item_ref, {})
-                cur_item, reason = find_current_item(old_fields)
-                if reason and reason.startswith('ambiguous'):
-                    ambiguous += 1
-                    continue
-                if not cur_item:
-                    skipped_missing += 1
-                    continue
-
-                try:
-                    raw = base64.b64decode(b64data)
-                except Exception:
-                    try:
-                        raw = b64data.encode('utf-8')
-                    except Exception:
-                        continue
+        # Pending PreviewImage rows keyed by (item_id, order): a later fixture
+        # entry for the same slot replaces an earlier one, as the old
+        # delete+create per entry did.
+        pending = {}
+
+        def flush():
+            if not pending:
+                return
+            slots = reduce(or_, (Q(item_id=i, order=o) for i, o in pending))
+            with transaction.atomic():
+                PreviewImage.objects.filter(slots).delete()
+                PreviewImage.objects.bulk_create(pending.values(), batch_size=FLUSH_EVERY)
+            pending.clear()
+
+        def restore_preview(fields):
+            nonlocal restored_preview_images, ambiguous, skipped_missing
+            old_item_ref = fields.get('item')
+            order = fields.get('order') or 0
+            b64data = fields.get('data')
+            content_type = fields.get('content_type')
+
+            if b64data is None:
+                return
+
+            # find original item fields and then current Item
+            old_fields = oldpk_to_fields.get(old_item_ref, {})
+            cur_item, reason = find_current_item(old_fields)
+            if reason and reason.startswith('ambiguous'):
+                ambiguous += 1
+                return
+            if not cur_item:
+                skipped_missing += 1
+                return
 
-                if dry:
-                    restored_preview_images += 1
-                    continue
+            # dumpdata always base64-encodes BinaryField; anything that fails to
+            # decode is not an image, so skip it rather than storing the text
+            try:
+                raw = _b64decode(b64data)
+            except Exception:
+                return
 
-                # delete existing previews for this item at this order if any collision
-                PreviewImage.objects.filter(item=cur_item, order=order).delete()
-                PreviewImage.objects.create(item=cur_item, order=order, data=raw, content_type=content_type)
+            if dry:
                 restored_preview_images += 1
+                return
+
+            # existing previews for this item at this order are replaced on flush
+            pending[(cur_item.id, order)] = PreviewImage(item=cur_item, order=order, data=raw, content_type=content_type)
+            restored_preview_images += 1
+            if len(pending) >= FLUSH_EVERY:
+                flush()
+
+        # Single pass over the fixture: build the old item PK -> fields
+        # mapping and restore previewimage entries as they are parsed.
+        # dumpdata emits item.item before item.previewimage, so the owning
+        # item is normally known by then; the rare entry seen before its
+        # item is deferred to a second pass (by pk, without its payload).
+        # The legacy preview_data blobs are left out of the mapping and
+        # restored in their own pass below, so the mapping stays small.
+        # Model labels in dumpdata output are already lowercase app.model.
+        oldpk_to_fields = {}
+        legacy_pks = set()
+        deferred_pks = set()
+        try:
+            entries = _fixture_reader(path)
+            for obj in entries():
+                model = obj.get('model')
+                if model == 'item.item':
+                    pk = obj.get('pk')
+                    fields = obj.get('fields', {})
+                    if fields.get('preview_data'):
+                        legacy_pks.add(pk)
+                    oldpk_to_fields[pk] = {k: v for k, v in fields.items() if k != 'preview_data'}
+                elif model == 'item.previewimage':
+                    fields = obj.get('fields', {})
+                    if fields.get('item') not in oldpk_to_fields:
+                        deferred_pks.add(obj.get('pk'))
+                        continue
+                    restore_preview(fields)
+        except DatabaseError as e:
+            # a failed preview write, not a bad fixture
+            self.stderr.write(self.style.ERROR(f'Failed to write preview images: {e}'))
+            return
+        except Exception as e:
+            flush()
+            self.stderr.write(self.style.ERROR(f'Failed to parse JSON: {e}'))
+            return
+
+        for obj in (entries() if deferred_pks else ()):
+            if obj.get('model') == 'item.previewimage' and obj.get('pk') in deferred_pks:
+                restore_preview(obj.get('fields', {}))
+        flush()
+
+        # Also restore legacy preview_data field if present in item entries.
+        # Items that have PreviewImage rows are looked up once (after the
+        # flush above) instead of an exists() per entry, and the updates are
+        # written with bulk_update in batches instead of a save() per item.
+        items_with_previews = set()
+        if legacy_pks and not dry:
+            items_with_previews = set(PreviewImage.objects.values_list('item_id', flat=True).distinct())
+        legacy_pending = {}
 
-        # Also restore legacy preview_data field if present in item entries
-        for oldpk, fields in oldpk_to_fields.items():
+        def flush_legacy():
+            if not legacy_pending:
+                return
+            with transaction.atomic():
+                # bulk_update skips auto_now, so updated_at is set by hand
+                Item.objects.bulk_update(legacy_pending.values(), ['preview_data', 'preview_content_type', 'updated_at'], batch_size=FLUSH_EVERY)
+            legacy_pending.clear()
+
+        for obj in (entries() if legacy_pks else ()):
+            if obj.get('model') != 'item.item' or obj.get('pk') not in legacy_pks:
+                continue
+            fields = obj.get('fields', {})
             b64preview = fields.get('preview_data')
             pct = fields.get('preview_content_type')
             if not b64preview:
@@ -145,24 +256,25 @@ class Command(BaseCommand):
                 skipped_missing += 1
                 continue
 
+            # undecodable payloads are skipped, as for PreviewImage rows above
             try:
-                raw = base64.b64decode(b64preview)
+                raw = _b64decode(b64preview)
             except Exception:
-                try:
-                    raw = b64preview.encode('utf-8')
-                except Exception:
-                    continue
+                continue
 
             if dry:
                 restored_legacy_previews += 1
                 continue
 
-            # Only set legacy preview_data if no PreviewImage exists
-            if not cur_item.preview_images.exists():
-                cur_item.preview_data = raw
-                cur_item.preview_content_type = pct
-                cur_item.save()
+            # Only set legacy preview_data if no PreviewImage exists. A bare
+            # pk-only copy is queued so the blob isn't kept alive by the
+            # lookup indexes after its batch is flushed.
+            if cur_item.id not in items_with_previews:
+                legacy_pending[cur_item.id] = Item(pk=cur_item.pk, preview_data=raw, preview_content_type=pct, updated_at=timezone.now())
                 restored_legacy_previews += 1
+                if len(legacy_pending) >= FLUSH_EVERY:
+                    flush_legacy()
+        flush_legacy()
 
         self.stdout.write(self.style.SUCCESS(f'Restored preview images: {restored_preview_images}'))
         self.stdout.write(self.style.SUCCESS(f'Restored legacy preview_data: {restored_legacy_previews}'))
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.8 on 2026-10-15 09:12
+
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def dedupe_items(apps, schema_editor):
+    """Keep one Item per (external_id, source) so the constraint can be added.
+
+    Of each duplicate group the row with the most PreviewImages is kept, then
+    one with legacy preview_data, then the oldest; the others are deleted
+    (with their previews).
+    """
+    Item = apps.get_model('item', 'Item')
+    groups = (
+        Item.objects.values('external_id', 'source')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+    )
+    for group in groups:
+        rows = (
+            Item.objects.filter(external_id=group['external_id'], source=group['source'])
+            .annotate(
+                previews=Count('preview_images'),
+                legacy=Count('id', filter=Q(preview_data__isnull=False)),
+            )
+            .order_by('-previews', '-legacy', 'id')
+            .values_list('id', flat=True)
+        )
+        keep, *drop = rows
+        Item.objects.filter(pk__in=drop).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('item', '0004_previewimage'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_items, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='item',
+            unique_together={('external_id', 'source')},
+        ),
+    ]
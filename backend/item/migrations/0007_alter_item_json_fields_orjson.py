@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-15 10:05
+
+import item.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('item', '0006_item_item_link_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='item',
+            name='characters',
+            field=item.fields.OrjsonJSONField(blank=True, default=list),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='tags',
+            field=item.fields.OrjsonJSONField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='titles',
+            field=item.fields.OrjsonJSONField(blank=True, default=list),
+        ),
+    ]
@@ -1,20 +1,33 @@
 from django.db import models
 
+from .fields import OrjsonJSONField
+
 
 class Item(models.Model):
     external_id = models.IntegerField()
     # source identifies which JSON/data source this record came from (e.g. 'manosaba', 'mygo')
     source = models.CharField(max_length=64, blank=True, default='')
     situation = models.CharField(max_length=64, blank=True)
-    titles = models.JSONField(default=list, blank=True)
-    characters = models.JSONField(default=list, blank=True)
+    titles = OrjsonJSONField(default=list, blank=True)
+    characters = OrjsonJSONField(default=list, blank=True)
     artist = models.CharField(max_length=255, blank=True)
     link = models.URLField(blank=True)
-    tags = models.JSONField(null=True, blank=True)
+    tags = OrjsonJSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # bumped on every save; drives the ETag of the item list
+    updated_at = models.DateTimeField(auto_now=True)
     preview_data = models.BinaryField(null=True, blank=True)
     preview_content_type = models.CharField(max_length=100, null=True, blank=True)
 
+    class Meta:
+        # one row per entry of a source file; lets import_json_data upsert.
+        # Its index also serves lookups by external_id alone (leading column).
+        unique_together = [('external_id', 'source')]
+        indexes = [
+            # restore_previews_from_fixture matches items by link
+            models.Index(fields=['link'], name='item_link_idx'),
+        ]
+
     def __str__(self):
         return f"{self.external_id} - {self.artist or 'unknown'}"
 
@@ -1,28 +1,252 @@
 import os
 import re
+import json
+import time
 from urllib.parse import urljoin, urlparse
-import base64
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 try:
-    from playwright.sync_api import sync_playwright
-    HAVE_PLAYWRIGHT = True
+    import fcntl
+    HAVE_FCNTL = True
 except Exception:
-    HAVE_PLAYWRIGHT = False
+    HAVE_FCNTL = False
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    # shared keep-alive pool for pximg downloads across calls and _pN variants
+    _SESSION = requests.Session()
+    _adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16,
+                           max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504)))
+    _SESSION.mount('https://', _adapter)
+    _SESSION.mount('http://', _adapter)
+except Exception:
+    _SESSION = None
 try:
-    # import the generic renderer to use as a fallback when helper finds nothing
-    from .headless_fetch import fetch_rendered_media
+    # import the generic renderer to use as a fallback when helper finds nothing;
+    # the browser itself comes from its get_browser()
+    from .headless_fetch import HAVE_PLAYWRIGHT, fetch_rendered_media, get_browser, run_in_browser_thread
     HAVE_RENDERER = True
 except Exception:
     fetch_rendered_media = None
+    get_browser = None
+    run_in_browser_thread = None
+    HAVE_PLAYWRIGHT = False
     HAVE_RENDERER = False
 
 
-def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
+# Headers every pixiv request carries (browser context, ctx.request and the
+# requests session); pximg rejects image fetches without a pixiv Referer.
+_PIXIV_HEADERS = {'Referer': 'https://www.pixiv.net/', 'User-Agent': 'fanart-viewer-bot/1.0'}
+
+
+# Logged-in browser state (cookies + localStorage) saved after a successful
+# login so later calls can skip the login flow until it goes stale.
+_STATE_PATH = os.path.join(
+    os.environ.get('PIXIV_STATE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'fanart_viewer'),
+    'pixiv_state.json',
+)
+_STATE_TTL = int(os.environ.get('PIXIV_STATE_TTL', str(6 * 3600)))
+
+
+def _state_lock(exclusive):
+    """Open and flock the lock file guarding _STATE_PATH (None if unavailable)."""
+    if not HAVE_FCNTL:
+        return None
+    try:
+        os.makedirs(os.path.dirname(_STATE_PATH), mode=0o700, exist_ok=True)
+        fh = open(_STATE_PATH + '.lock', 'a')
+        fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return fh
+    except Exception:
+        return None
+
+
+def _load_state():
+    """Return the saved storage_state dict if it is younger than the TTL."""
+    lock = _state_lock(False)
+    try:
+        if time.time() - os.path.getmtime(_STATE_PATH) > _STATE_TTL:
+            return None
+        with open(_STATE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return None
+    finally:
+        if lock:
+            lock.close()
+
+
+def _save_state(ctx):
+    lock = _state_lock(True)
+    try:
+        os.makedirs(os.path.dirname(_STATE_PATH), mode=0o700, exist_ok=True)
+        tmp = _STATE_PATH + '.tmp'
+        # session cookies: owner-only, whatever the umask
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(ctx.storage_state(), f)
+        os.replace(tmp, _STATE_PATH)
+    except Exception:
+        pass
+    finally:
+        if lock:
+            lock.close()
+
+
+def _drop_state():
+    lock = _state_lock(True)
+    try:
+        os.remove(_STATE_PATH)
+    except Exception:
+        pass
+    finally:
+        if lock:
+            lock.close()
+
+
+def _is_login_wall(page):
+    try:
+        return 'accounts.pixiv.net' in (page.url or '')
+    except Exception:
+        return False
+
+
+# pixiv master -> original URL rewrites, compiled once at import
+_RE_C_IMG_MASTER = re.compile(r'^/c/\d+x\d+/img-master')
+_RE_MASTER_SUFFIX = re.compile(r'_master\d+(?=\.)')
+_RE_PN_MASTER = re.compile(r'(_p\d+)_master\d+')
+# page-number slot of a _pN URL
+_RE_PN = re.compile(r'_p\d+')
+_RE_PN_TEMPLATE = re.compile(r'(_p)\d+')
+# artwork image paths; avatars, icons and UI sprites never match
+_RE_ARTWORK_PATH = re.compile(r'/img-(?:master|original)/')
+
+
+# og:image + <img> src/srcset/data-* URLs, absolute and deduplicated
+_SCRAPE_IMGS_JS = r"""
+(maxBases) => {
+  const out = [];
+  const og = document.querySelector('meta[property="og:image"]');
+  if (og && og.content) out.push(og.content);
+  for (const img of document.images) {
+    const src = img.getAttribute('src');
+    if (src) out.push(src);
+    const srcset = img.getAttribute('srcset') || img.getAttribute('data-srcset');
+    if (srcset) {
+      for (const part of srcset.split(',')) {
+        const u = part.trim().split(/\s+/)[0];
+        if (u) out.push(u);
+      }
+    }
+    const ds = img.getAttribute('data-src') || img.getAttribute('data-original') || img.getAttribute('data-image-url');
+    if (ds) out.push(ds);
+  }
+  const abs = u => { try { return new URL(u, location.href); } catch (e) { return null; } };
+  const all = [...new Set(out.map(abs).filter(Boolean).map(u => u.href))];
+  const ogUrl = og && og.content ? abs(og.content) : null;
+  // pixiv-hosted URLs only (same test as _is_pixiv_host), stopping once
+  // maxBases distinct artworks (size prefix and _pN stripped) are seen
+  const pixiv = [];
+  const bases = new Set();
+  for (const href of all) {
+    const u = new URL(href);
+    if (!u.hostname.includes('pixiv') && !u.hostname.includes('pximg')) continue;
+    const base = u.pathname.replace(/^\/c\/[^/]+/, '').replace('/img-master/', '/img-original/').replace(/_p\d+.*$/, '');
+    if (!bases.has(base)) {
+      if (bases.size >= maxBases) continue;
+      bases.add(base);
+    }
+    pixiv.push(href);
+  }
+  return {found: all.length, first: all[0] || null, og: ogUrl ? ogUrl.href : null, pixiv};
+}
+"""
+
+
+# Subresources the pixiv scrape never needs. Images stay allowed (the
+# response listener captures them), as do document/script/xhr/fetch.
+_BLOCKED_RESOURCE_TYPES = frozenset(('stylesheet', 'font', 'media', 'other', 'websocket'))
+_BLOCKED_HOST_MARKERS = ('google-analytics', 'googletagmanager', 'doubleclick', 'adservice')
+
+
+def _block_noise(route):
+    req = route.request
+    if req.resource_type in _BLOCKED_RESOURCE_TYPES or any(d in req.url for d in _BLOCKED_HOST_MARKERS):
+        route.abort()
+    else:
+        route.continue_()
+
+
+_PIXIV_IMAGES_READY_JS = "() => document.readyState === 'complete' && !!document.querySelector('img[src*=\"pximg\"]')"
+
+
+def _wait_for_pixiv_images(page, timeout_ms):
+    """Wait (bounded) until the page has loaded and shows a pximg image.
+
+    Returns as soon as the artwork is in the DOM instead of waiting for
+    `networkidle`, which pixiv pages rarely reach before the timeout.
+    """
+    try:
+        page.wait_for_function(_PIXIV_IMAGES_READY_JS, polling=100, timeout=timeout_ms)
+    except Exception:
+        pass
+
+
+# The same URLs are parsed and classified in several passes (pixiv filter,
+# _pN loop, prefetch, fetch paths, fallback); cache both steps.
+_parse = lru_cache(maxsize=1024)(urlparse)
+
+
+# helper to detect pixiv-hosted images
+@lru_cache(maxsize=256)
+def _is_pixiv_host(h):
+    if not h:
+        return False
+    return 'pixiv' in h or 'pximg' in h or 'i.pximg.net' in h
+
+
+# the same URLs come through the _pN loop, the prefetch and the rendered
+# fallback, so memoize the rewrite
+@lru_cache(maxsize=512)
+def make_pixiv_original_candidate(url):
+    try:
+        p = _parse(url)
+        net = p.netloc
+        path = p.path
+        if not _is_pixiv_host(net):
+            return url
+        # remove /c/.../img-master prefix
+        path = _RE_C_IMG_MASTER.sub('/img-master', path)
+        path = path.replace('/img-master/', '/img-original/')
+        path = _RE_MASTER_SUFFIX.sub('', path)
+        path = _RE_PN_MASTER.sub(r'\1', path)
+        # Ensure the common original path includes the extra 'img' segment
+        # e.g. /img-original/img/2024/... which Pixiv uses for originals.
+        if '/img-original/' in path and '/img-original/img/' not in path:
+            path = path.replace('/img-original/', '/img-original/img/', 1)
+        return f"{p.scheme}://{p.netloc}{path}"
+    except Exception:
+        return url
+
+
+def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000, context=None, debug=False):
     """Return list of (idx, bytes, content_type) fetched from target_url using Playwright login to Pixiv.
     Requires PIXIV_USER and PIXIV_PASS in env.
+
+    `context` is an optional browser context to work in (see fetch_many);
+    it is left open, only the page opened on it is closed. The result only
+    carries a 'debug' entry (counts and every attempted fetch) when `debug`
+    is true. The browser work runs on a Playwright worker thread, never on
+    the caller's.
     """
-    if not HAVE_PLAYWRIGHT:
+    if not HAVE_PLAYWRIGHT or get_browser is None:
         raise RuntimeError('playwright not available')
+    return run_in_browser_thread(_fetch_images, target_url, headful, timeout_ms, context, debug)
+
 
+def _fetch_images(target_url, headful, timeout_ms, context, debug):
     pixiv_user = os.environ.get('PIXIV_USER') or os.environ.get('PIXIV_USERNAME')
     pixiv_pass = os.environ.get('PIXIV_PASS') or os.environ.get('PIXIV_PASSWORD')
     if not pixiv_user or not pixiv_pass:
@@ -30,244 +254,253 @@ def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
 
     results = []
     logged_in = False
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=not headful)
-        ctx = browser.new_context()
-        page = ctx.new_page()
-
-        # login
-        login_url = 'https://accounts.pixiv.net/login'
-        page.goto(login_url)
+    # reuse the session saved by an earlier call instead of logging in again
+    state = _load_state()
+
+    # The browser stays warm between calls (shared per thread with the
+    # headless renderer); each call only opens and closes its own context,
+    # which is cheap and keeps cookies from leaking between calls.
+    if context is None:
+        browser = get_browser('chromium', headless=not headful)
+        ctx = browser.new_context(storage_state=state) if state else browser.new_context()
+    else:
+        ctx = context
+    page = None
+    try:
+        # Set the pixiv headers before the first navigation so the login page
+        # and every subresource request carry them too.
         try:
-            if page.query_selector('input[name="pixiv_id"]'):
-                page.fill('input[name="pixiv_id"]', pixiv_user)
-            elif page.query_selector('input[id="LoginForm-username"]'):
-                page.fill('input[id="LoginForm-username"]', pixiv_user)
-            else:
-                if page.query_selector('input[type="email"]'):
-                    page.fill('input[type="email"]', pixiv_user)
-
-            if page.query_selector('input[name="password"]'):
-                page.fill('input[name="password"]', pixiv_pass)
-            elif page.query_selector('input[id="LoginForm-password"]'):
-                page.fill('input[id="LoginForm-password"]', pixiv_pass)
-
-            if page.query_selector('button[type="submit"]'):
-                page.click('button[type="submit"]')
-            else:
-                page.keyboard.press('Enter')
+            ctx.set_extra_http_headers(_PIXIV_HEADERS)
         except Exception:
-            # proceed, maybe already logged in
             pass
+        page = ctx.new_page()
 
-        try:
-            page.wait_for_load_state('networkidle', timeout=20000)
-        except Exception:
-            pass
+        def _login():
+            login_url = 'https://accounts.pixiv.net/login'
+            page.goto(login_url)
+            try:
+                if page.query_selector('input[name="pixiv_id"]'):
+                    page.fill('input[name="pixiv_id"]', pixiv_user)
+                elif page.query_selector('input[id="LoginForm-username"]'):
+                    page.fill('input[id="LoginForm-username"]', pixiv_user)
+                else:
+                    if page.query_selector('input[type="email"]'):
+                        page.fill('input[type="email"]', pixiv_user)
+
+                if page.query_selector('input[name="password"]'):
+                    page.fill('input[name="password"]', pixiv_pass)
+                elif page.query_selector('input[id="LoginForm-password"]'):
+                    page.fill('input[id="LoginForm-password"]', pixiv_pass)
+
+                if page.query_selector('button[type="submit"]'):
+                    page.click('button[type="submit"]')
+                else:
+                    page.keyboard.press('Enter')
+            except Exception:
+                # proceed, maybe already logged in
+                pass
 
-        # after attempting login, inspect cookies to heuristically detect login success
-        try:
-            cookies = ctx.cookies()
-            for c in cookies:
-                if c.get('domain') and ('pixiv' in c.get('domain') or 'pximg' in c.get('domain')):
-                    logged_in = True
-                    break
-        except Exception:
-            logged_in = False
+            # Wait for the redirect away from the login form instead of network
+            # idle, which pixiv's long-polling pages rarely reach
+            try:
+                page.wait_for_url(lambda u: 'accounts.pixiv.net' not in u, wait_until='domcontentloaded', timeout=20000)
+            except Exception:
+                pass
+
+            # after attempting login, inspect cookies to heuristically detect
+            # login success, and persist the session for later calls
+            ok = False
+            try:
+                cookies = ctx.cookies()
+                for c in cookies:
+                    if c.get('domain') and ('pixiv' in c.get('domain') or 'pximg' in c.get('domain')):
+                        ok = True
+                        break
+            except Exception:
+                ok = False
+            if ok:
+                _save_state(ctx)
+            return ok
+
+        if state is None:
+            logged_in = _login()
+        else:
+            logged_in = True
 
         # Attach a response listener to capture image responses made while
         # loading the target page. This captures requests that the logged-in
         # browser makes (with cookies) and avoids separate navigations.
-        captured_responses = []
+        # Indexed by URL at capture time (url -> (body, content_type)). The
+        # sync API dispatches events on this thread while it waits inside a
+        # Playwright call, so no locking is needed.
+        captured_map = {}
         def _on_response(r):
             try:
                 u = r.url
             except Exception:
                 return
             try:
-                if 'pximg' in u or 'pixiv' in u:
+                # Only artwork images are ever looked up, so don't pull the
+                # body (a CDP round trip plus a copy) of anything else, nor of
+                # responses already known to be below the 10 KiB threshold.
+                if ('pximg' in u or 'pixiv' in u) and _RE_ARTWORK_PATH.search(u):
                     headers = r.headers or {}
                     ct = headers.get('content-type','')
-                    if ct and ct.split(';',1)[0].startswith('image'):
+                    try:
+                        length = int(headers.get('content-length') or -1)
+                    except ValueError:
+                        length = -1
+                    if ct and ct.split(';',1)[0].startswith('image') and not 0 <= length < 10240:
                         try:
                             b = r.body()
                         except Exception:
                             b = None
-                        captured_responses.append({'url': u, 'body': b, 'content_type': ct, 'status': getattr(r, 'status', None)})
+                        if b:
+                            captured_map[u] = (b, ct)
             except Exception:
                 return
 
-        # Ensure requests from the browser include a Referer; some pixiv
-        # resources are guarded by referer checks. Set extra headers on the
-        # context before navigating so subresource requests carry them.
-        try:
-            ctx.set_extra_http_headers({'Referer': 'https://www.pixiv.net/', 'User-Agent': 'fanart-viewer-bot/1.0'})
-        except Exception:
-            pass
         page.on('response', _on_response)
-        page.goto(target_url)
         try:
-            page.wait_for_load_state('networkidle', timeout=timeout_ms)
+            page.route('**/*', _block_noise)
         except Exception:
             pass
-        # Build a lookup map of captured responses by URL for quick access
-        captured_map = {c['url']: (c['body'], c.get('content_type')) for c in captured_responses if c.get('body')}
-
-        # If we didn't capture useful pixiv-hosted images yet, try to
-        # interact with the page (click the first pixiv-hosted img) to
-        # trigger lazy-loading / lightbox behaviors that request originals.
-        if not captured_map and pixiv_imgs:
-            try:
-                imgs_handles = page.query_selector_all('img')
-                clicked = False
-                for ih in imgs_handles:
-                    try:
-                        src = ih.get_attribute('src')
-                    except Exception:
-                        src = None
-                    if not src:
-                        continue
-                    if 'pximg' in src or 'pixiv' in src:
-                        try:
-                            # try clicking the parent anchor first
-                            parent = ih.evaluate_handle('el => el.closest("a")')
-                            if parent:
-                                try:
-                                    parent.as_element().click()
-                                except Exception:
-                                    try:
-                                        ih.click()
-                                    except Exception:
-                                        pass
-                            else:
-                                try:
-                                    ih.click()
-                                except Exception:
-                                    pass
-                            clicked = True
-                            page.wait_for_load_state('networkidle', timeout=5000)
-                            break
-                        except Exception:
-                            continue
-                # rebuild captured_map after interaction
-                captured_map = {c['url']: (c['body'], c.get('content_type')) for c in captured_responses if c.get('body')}
-            except Exception:
-                pass
-
-        imgs = []
+        page.goto(target_url)
+        if state is not None and _is_login_wall(page):
+            # the saved session has expired server-side: log in once more
+            _drop_state()
+            logged_in = _login()
+            page.goto(target_url)
+        _wait_for_pixiv_images(page, timeout_ms)
+
+        # Collect og:image plus every <img> src/srcset/data-* URL in a single
+        # evaluate (one CDP round trip instead of several per <img>); the
+        # page resolves them to absolute URLs and dedupes them in order.
+        # The page also filters to pixiv-hosted URLs and stops after
+        # MAX_PAGES distinct artworks, so nothing is re-filtered here.
+        MAX_PAGES = 8
         try:
-            og = page.query_selector('meta[property="og:image"]')
-            if og:
-                v = og.get_attribute('content')
-                if v:
-                    imgs.append(v)
-            for img in page.query_selector_all('img'):
-                try:
-                    src = img.get_attribute('src')
-                except Exception:
-                    src = None
-                if src and src not in imgs:
-                    imgs.append(src)
-                try:
-                    srcset = img.get_attribute('srcset') or img.get_attribute('data-srcset')
-                except Exception:
-                    srcset = None
-                if srcset:
-                    for part in (srcset or '').split(','):
-                        try:
-                            u = part.strip().split()[:1][0]
-                            if u and u not in imgs:
-                                imgs.append(u)
-                        except Exception:
-                            continue
-                try:
-                    ds = img.get_attribute('data-src') or img.get_attribute('data-original') or img.get_attribute('data-image-url')
-                except Exception:
-                    ds = None
-                if ds and ds not in imgs:
-                    imgs.append(ds)
+            scraped = page.evaluate(_SCRAPE_IMGS_JS, MAX_PAGES) or {}
         except Exception:
-            pass
-
-        if not imgs:
             # no immediate images found in DOM; we'll consider using the
             # generic renderer as a fallback later (after attempting pixiv fetches)
-            imgs = []
-
-        # helper to detect pixiv-hosted images
-        def _is_pixiv_host(h):
-            if not h:
-                return False
-            return 'pixiv' in h or 'pximg' in h or 'i.pximg.net' in h
-
-        def make_pixiv_original_candidate(url):
-            try:
-                p = urlparse(url)
-                net = p.netloc
-                path = p.path
-                if not _is_pixiv_host(net):
-                    return url
-                # remove /c/.../img-master prefix
-                path = re.sub(r'^/c/\d+x\d+/img-master', '/img-master', path)
-                path = path.replace('/img-master/', '/img-original/')
-                path = re.sub(r'_master\d+(?=\.)', '', path)
-                path = re.sub(r'(_p\d+)_master\d+', r'\1', path)
-                # Ensure the common original path includes the extra 'img' segment
-                # e.g. /img-original/img/2024/... which Pixiv uses for originals.
-                if '/img-original/' in path and '/img-original/img/' not in path:
-                    path = path.replace('/img-original/', '/img-original/img/', 1)
-                return f"{p.scheme}://{p.netloc}{path}"
-            except Exception:
-                return url
-
-        # Filter to pixiv artwork images and prefer p0/original
-        pixiv_imgs = []
-        for u in imgs:
-            try:
-                full = page.evaluate('(u)=>new URL(u, location.href).href', u)
-            except Exception:
-                full = u
-            try:
-                pu = urlparse(full)
-                if _is_pixiv_host(pu.netloc):
-                    pixiv_imgs.append(full)
-            except Exception:
-                continue
+            scraped = {}
+        pixiv_imgs = scraped.get('pixiv') or []
+        first_img = scraped.get('first')
 
         # Prepare fetch candidates. For pixiv-hosted images, try multiple _pN variants
         # so callers can select the largest-bytes image. We'll attempt up to MAX_PAGES.
-        candidates = []
-        if pixiv_imgs:
-            for u in pixiv_imgs:
-                candidates.append(u)
-        else:
-            candidates = [imgs[0]]
+        # Thumbnails of one artwork only differ in size prefix and _pN index,
+        # so key _pN URLs by their original-image page template and walk each
+        # template once instead of once per thumbnail.
+        candidates = {}
+        for u in (pixiv_imgs or ([first_img] if first_img else [])):
+            try:
+                paged = bool(_RE_PN.search(_parse(u).path))
+            except Exception:
+                paged = False
+            key = _RE_PN_TEMPLATE.sub(r'\1{}', make_pixiv_original_candidate(u)) if paged else u
+            candidates.setdefault(key, (u, paged))
 
         seen_urls = set()
-        MAX_PAGES = 8
         # track whether we attempted a rendered fallback and any small candidates found
         fallback_used = False
-        main_small_found = []
-        pw_fallback_small_found = []
-        # record every attempted fetch for debugging (url, size, content_type, phase)
+        main_small_found = 0
+        pw_fallback_small_found = 0
+        # record every attempted fetch for debugging (url, size, content_type,
+        # phase); only kept when the caller asked for the debug payload
         attempted_fetches = []
+
+        def _record(url, body, content_type, phase):
+            if debug:
+                attempted_fetches.append({'url': url, 'size': len(body) if body else 0, 'content_type': content_type, 'phase': phase})
         # helper to fetch a candidate URL using the logged-in page context so
         # cookies and session headers are sent (avoids 403 from pixiv).
-        # Build a cookie header string from context cookies so we can use it
-        # in fallback requests (requests.get). This helps when ctx.request
-        # doesn't include browser cookies automatically.
-        cookie_header = None
+        # Build the requests-session headers once from the context cookies so
+        # fallback requests (requests.get) are authenticated. Only pixiv
+        # cookies are relevant; the rest would just bloat every request.
+        session_headers = dict(_PIXIV_HEADERS)
         try:
-            ck = ctx.cookies()
-            parts = []
-            for c in ck:
-                if c.get('name') and c.get('value'):
-                    parts.append(f"{c.get('name')}={c.get('value')}")
-            if parts:
-                cookie_header = '; '.join(parts)
+            cookie_header = '; '.join(
+                f"{c['name']}={c['value']}" for c in ctx.cookies(['https://www.pixiv.net/', 'https://i.pximg.net/'])
+                if c.get('name') and c.get('value')
+            )
         except Exception:
-            cookie_header = None
+            cookie_header = ''
+        if cookie_header:
+            session_headers['Cookie'] = cookie_header
+
+        def _fetch_via_session(url):
+            # Plain HTTPS GET with the browser's cookies and a pixiv Referer
+            # over the shared keep-alive pool; no browser round trip involved.
+            if _SESSION is None:
+                return None, None
+            try:
+                r = _SESSION.get(url, timeout=10, headers=session_headers, allow_redirects=True)
+                if r.status_code == 200:
+                    ct = r.headers.get('content-type','')
+                    if ct and ct.split(';',1)[0].startswith('image'):
+                        return r.content, ct
+            except Exception:
+                pass
+            return None, None
+
+        # Session results fetched ahead of time, keyed by URL
+        prefetched = {}
+
+        def _prefetch(urls):
+            # Independent GETs: run them concurrently over the session pool
+            # (Playwright calls can't be spread across threads, but plain
+            # requests can), so the sequential loop below only has to drive
+            # the browser for URLs that didn't come back as images.
+            if _SESSION is None:
+                return
+            urls = [u for u in dict.fromkeys(urls) if u not in prefetched and u not in captured_map]
+            if not urls:
+                return
+            with ThreadPoolExecutor(max_workers=min(len(urls), 16)) as ex:
+                for u, res in zip(urls, ex.map(_fetch_via_session, urls)):
+                    prefetched[u] = res
+
+        # URLs a HEAD probe showed not to be worth a GET (see _prefetch_pages)
+        pruned = set()
+
+        def _head(url):
+            try:
+                r = _SESSION.head(url, timeout=10, headers=session_headers, allow_redirects=True)
+                return r.status_code, int(r.headers.get('content-length') or -1)
+            except Exception:
+                return None, -1
+
+        def _prefetch_pages(pages):
+            # HEAD-probe every page variant (headers only, concurrently), then
+            # GET bodies only where one is worth having. Variants answering
+            # 404 or shorter than the 10 KiB image threshold are pruned, as is
+            # every page after the first whose variants all 404 (pixiv
+            # returns 404 past the last page). Other statuses (e.g. a HEAD
+            # rejected with 403) still get a GET.
+            if _SESSION is None:
+                return
+            urls = list(dict.fromkeys(u for grp in pages for u in grp if u not in prefetched and u not in captured_map))
+            if not urls:
+                return
+            with ThreadPoolExecutor(max_workers=min(len(urls), 16)) as ex:
+                heads = dict(zip(urls, ex.map(_head, urls)))
+            to_get = []
+            ended = False
+            for grp in pages:
+                probed = [u for u in grp if u in heads]
+                if ended or (probed and all(heads[u][0] == 404 for u in probed)):
+                    ended = True
+                    pruned.update(probed)
+                    continue
+                for u in probed:
+                    st, ln = heads[u]
+                    if st == 404 or (st == 200 and 0 <= ln < 10240):
+                        pruned.add(u)
+                    else:
+                        to_get.append(u)
+            _prefetch(to_get)
 
         def _fetch_via_page(url, wait_for='networkidle', to_ms=10000):
             # Only run the Playwright-specific fetch attempts for Pixiv/pximg
@@ -276,58 +509,25 @@ def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
             # them by host to avoid side-effects.
             host_is_pixiv = False
             try:
-                host_is_pixiv = _is_pixiv_host(urlparse(url).netloc)
+                host_is_pixiv = _is_pixiv_host(_parse(url).netloc)
             except Exception:
                 host_is_pixiv = False
 
             if host_is_pixiv:
-                # First, attempt an in-page fetch via page.evaluate so the
-                # browser's credentials, cookies and headers are used and we
-                # can obtain the raw ArrayBuffer for the image. This often
-                # succeeds where direct navigation or server-side requests
-                # get 403s.
-                try:
-                    try:
-                        js = '''async (url, ref) => {
-                            try {
-                                const r = await fetch(url, { credentials: 'include', headers: { 'Referer': ref } });
-                                const status = r.status;
-                                const ct = r.headers.get('content-type');
-                                if (!r.ok) {
-                                    return { ok: false, status, content_type: ct, b64: null };
-                                }
-                                const ab = await r.arrayBuffer();
-                                const bytes = new Uint8Array(ab);
-                                const chunk = 0x8000;
-                                let binary = '';
-                                for (let i = 0; i < bytes.length; i += chunk) {
-                                    binary += String.fromCharCode.apply(null, Array.from(bytes.subarray(i, i + chunk)));
-                                }
-                                const b64 = btoa(binary);
-                                return { ok: true, status, content_type: ct, b64 };
-                            } catch (e) {
-                                return { ok: false, status: 0, content_type: null, b64: null, err: String(e) };
-                            }
-                        }'''
-                        pv = page.evaluate(js, url, 'https://www.pixiv.net/')
-                    except Exception:
-                        pv = None
-                    if pv and isinstance(pv, dict) and pv.get('ok') and pv.get('b64'):
-                        try:
-                            b = base64.b64decode(pv.get('b64'))
-                            return b, pv.get('content_type') or pv.get('content-type')
-                        except Exception:
-                            # fall through to other methods if decode fails
-                            pass
-                except Exception:
-                    pass
+                # Image originals only need the session cookies + Referer, so
+                # try a direct request first and only fall back to the browser
+                # (403 / login wall / non-image) when that fails.
+                b, ct = prefetched[url] if url in prefetched else _fetch_via_session(url)
+                if b:
+                    return b, ct
 
                 # Next, try Playwright's request API on the browser context.
-                # This uses the browser's cookies/session and does not suffer
-                # from fetch() CORS restrictions the page JS might hit.
+                # This uses the browser's cookies/session, does not suffer
+                # from fetch() CORS restrictions the page JS might hit, and
+                # returns the raw bytes (no base64 round trip through JS).
                 try:
                     try:
-                        r = ctx.request.get(url, headers={'Referer': 'https://www.pixiv.net/', 'User-Agent': 'fanart-viewer-bot/1.0'}, timeout=to_ms)
+                        r = ctx.request.get(url, headers=_PIXIV_HEADERS, timeout=to_ms)
                     except Exception:
                         r = None
                     if r:
@@ -377,37 +577,49 @@ def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
                         return body, ct
             # If page navigation didn't yield a result, fall back to requests
             # using the cookies we captured from the browser context.
-            try:
-                import requests as _requests
-                headers = {'Referer': 'https://www.pixiv.net/', 'User-Agent': 'fanart-viewer-bot/1.0'}
-                if cookie_header:
-                    headers['Cookie'] = cookie_header
-                r = _requests.get(url, timeout=10, headers=headers, allow_redirects=True)
-                if r.status_code == 200:
-                    ct = r.headers.get('content-type','')
-                    if ct and ct.split(';',1)[0].startswith('image'):
-                        return r.content, ct
-            except Exception:
-                pass
+            if not host_is_pixiv:
+                return _fetch_via_session(url)
             return None, None
 
-        for u in candidates:
-            try:
-                pu = urlparse(u)
-                path = pu.path
-            except Exception:
-                pu = None
-                path = ''
-
-            if re.search(r'_p\d+', path):
-                # build template to iterate p0..pN
-                base_template = re.sub(r'(_p)\d+', r'\1{}', u)
-                for i in range(0, MAX_PAGES):
-                    try:
-                        candidate_i = base_template.format(i)
-                    except Exception:
+        # Single-image posts are the common case and og:image usually points
+        # at the _p0 master, so try its original first. When that succeeds
+        # it is the _p0 result and the page walk below starts at _p1.
+        og_img = scraped.get('og')
+        if og_img and _RE_ARTWORK_PATH.search(og_img) and '_p0' in og_img:
+            og_orig = make_pixiv_original_candidate(og_img)
+            if og_orig in captured_map:
+                b, ct = captured_map[og_orig]
+            else:
+                try:
+                    b, ct = _fetch_via_page(og_orig)
+                except Exception:
+                    b, ct = None, None
+            _record(og_orig, b, ct, 'og')
+            if b and len(b) >= 10240 and ct and ct.startswith('image'):
+                seen_urls.add(og_orig)
+                results.append((0, b, ct, og_orig))
+
+        for key, (u, paged) in candidates.items():
+            if paged:
+                # key is the p0..pN template; build the page URLs once and
+                # share them between the prefetch and the trial loop
+                page_urls = [make_pixiv_original_candidate(key.format(i)) for i in range(0, MAX_PAGES)]
+                pages = []
+                for c in page_urls:
+                    if c in seen_urls:
                         continue
-                    candidate_i = make_pixiv_original_candidate(candidate_i)
+                    grp = [c]
+                    if c.endswith('.jpg'):
+                        grp.append(c[:-4] + '.png')
+                    elif c.endswith('.png'):
+                        grp.append(c[:-4] + '.jpg')
+                    pages.append(grp)
+                try:
+                    if _is_pixiv_host(_parse(u).netloc):
+                        _prefetch_pages(pages)
+                except Exception:
+                    pass
+                for i, candidate_i in enumerate(page_urls):
                     if candidate_i in seen_urls:
                         continue
                     seen_urls.add(candidate_i)
@@ -426,15 +638,20 @@ def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
 
                     body = None
                     content_type = None
+                    missing = True
                     for turl in trials:
                         if turl in captured_map:
                             b, ct = captured_map.get(turl, (None, None))
+                        elif turl in pruned:
+                            b, ct = None, None
                         else:
                             try:
                                 b, ct = _fetch_via_page(turl)
                             except Exception:
                                 b, ct = None, None
-                        attempted_fetches.append({'url': turl, 'size': len(b) if b else 0, 'content_type': ct, 'phase': 'main'})
+                        _record(turl, b, ct, 'main')
+                        if b:
+                            missing = False
                         if b and len(b) >= 10240:
                             body, content_type = b, ct
                             break
@@ -443,9 +660,13 @@ def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
                         if body and len(body) >= 10240:
                             results.append((i, body, content_type, candidate_i))
                         else:
-                            main_small_found.append((candidate_i, len(body) if body else 0, content_type))
+                            main_small_found += 1
                     except Exception:
-                        main_small_found.append((candidate_i, len(body) if body else 0, content_type))
+                        main_small_found += 1
+                    # pages are numbered contiguously, so once one has no
+                    # body at all the later ones won't exist either
+                    if missing:
+                        break
             else:
                 candidate_single = make_pixiv_original_candidate(u)
                 if candidate_single in seen_urls:
@@ -473,7 +694,7 @@ def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
                             b, ct = _fetch_via_page(turl)
                         except Exception:
                             b, ct = None, None
-                    attempted_fetches.append({'url': turl, 'size': len(b) if b else 0, 'content_type': ct, 'phase': 'main'})
+                    _record(turl, b, ct, 'main')
                     if b and len(b) >= 10240:
                         body, content_type = b, ct
                         break
@@ -481,9 +702,9 @@ def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
                     if body and len(body) >= 10240:
                         results.append((0, body, content_type, turl))
                     else:
-                        main_small_found.append((candidate_single, len(body) if body else 0, content_type))
+                        main_small_found += 1
                 except Exception:
-                    main_small_found.append((candidate_single, len(body) if body else 0, content_type))
+                    main_small_found += 1
 
         # If helper didn't fetch any useful images from pixiv-hosted paths,
         # attempt a fallback: use the generic rendered-media extractor to
@@ -513,14 +734,14 @@ def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
                                 body, ct = _fetch_via_page(h)
                             except Exception:
                                 body, ct = None, None
-                        attempted_fetches.append({'url': h, 'size': len(body) if body else 0, 'content_type': ct, 'phase': 'pw_fallback'})
+                        _record(h, body, ct, 'pw_fallback')
                         ok = False
                         if ct and ct.startswith('image') and body and len(body) >= 10240:
                             results.append((0, body, ct, h))
                             fallback_used = True
                             ok = True
                         else:
-                            pw_fallback_small_found.append((h, len(body) if body else 0, ct))
+                            pw_fallback_small_found += 1
                         if ok:
                             continue
                         # If raw rendered URL failed or was small, try the img-original candidate
@@ -535,9 +756,9 @@ def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
                                 body2, content_type = _fetch_via_page(candidate)
                             except Exception:
                                 body2, content_type = None, None
-                        attempted_fetches.append({'url': candidate, 'size': len(body2) if body2 else 0, 'content_type': content_type, 'phase': 'pw_fallback'})
+                        _record(candidate, body2, content_type, 'pw_fallback')
                         if body2 is None or len(body2) < 10240:
-                            pw_fallback_small_found.append((candidate, len(body2) if body2 else 0, content_type))
+                            pw_fallback_small_found += 1
                             continue
                         results.append((0, body2, content_type, candidate))
                         fallback_used = True
@@ -546,20 +767,59 @@ def fetch_images_with_playwright(target_url, headful=False, timeout_ms=12000):
         except Exception:
             pass
 
+    finally:
         try:
-            browser.close()
+            if context is None:
+                ctx.close()
+            elif page is not None:
+                page.close()
         except Exception:
             pass
 
-    # Prepare richer debug info for callers
-    debug = {
-        'found_count': len(imgs),
-        'pixiv_hosted_count': len(pixiv_imgs),
-        'returned_count': len(results),
-        'logged_in': logged_in,
-        'fallback_used': fallback_used,
-        'main_small_found_count': len(main_small_found),
-        'pw_fallback_small_found_count': len(pw_fallback_small_found),
-        'attempted_fetches': attempted_fetches,
-    }
-    return {'logged_in': logged_in, 'images': results, 'debug': debug}
+    res = {'logged_in': logged_in, 'images': results}
+    if debug:
+        # Prepare richer debug info for callers
+        res['debug'] = {
+            'found_count': scraped.get('found', 0),
+            'pixiv_hosted_count': len(pixiv_imgs),
+            'returned_count': len(results),
+            'logged_in': logged_in,
+            'fallback_used': fallback_used,
+            'main_small_found_count': main_small_found,
+            'pw_fallback_small_found_count': pw_fallback_small_found,
+            'attempted_fetches': attempted_fetches,
+        }
+    return res
+
+
+def fetch_many(target_urls, headful=False, timeout_ms=12000, debug=False):
+    """Fetch several pixiv artworks through one shared browser context.
+
+    The login (or saved session) and the context's connections are reused
+    for every URL instead of being set up per artwork. Returns a list of
+    (target_url, result) pairs in input order, where result is what
+    fetch_images_with_playwright returned or the exception it raised.
+    """
+    if not HAVE_PLAYWRIGHT or get_browser is None:
+        raise RuntimeError('playwright not available')
+    return run_in_browser_thread(_fetch_many, target_urls, headful, timeout_ms, debug)
+
+
+def _fetch_many(target_urls, headful, timeout_ms, debug):
+    state = _load_state()
+    browser = get_browser('chromium', headless=not headful)
+    ctx = browser.new_context(storage_state=state) if state else browser.new_context()
+    out = []
+    try:
+        for target_url in target_urls:
+            try:
+                res = _fetch_images(target_url, headful, timeout_ms, ctx, debug)
+            except Exception as e:
+                res = e
+            out.append((target_url, res))
+    finally:
+        try:
+            ctx.close()
+        except Exception:
+            pass
+    return out
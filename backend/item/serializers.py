@@ -5,7 +5,8 @@ from .models import Item
 class ItemSerializer(serializers.ModelSerializer):
     # Expose a lightweight boolean so list endpoints can show whether
     # a preview exists without embedding the full binary data in every item.
-    has_preview = serializers.SerializerMethodField()
+    # Querysets annotate it in SQL (see views._with_has_preview).
+    has_preview = serializers.BooleanField(read_only=True)
 
     class Meta:
         model = Item
@@ -13,24 +14,6 @@ class ItemSerializer(serializers.ModelSerializer):
         exclude = ('preview_data',)
         read_only_fields = ('preview_content_type', 'has_preview')
 
-    def get_has_preview(self, obj):
-        # Prefer to check PreviewImage related rows; fall back to legacy preview_data
-        try:
-            # use hasattr to avoid accidental DB hits if relation broken
-            if hasattr(obj, 'preview_images'):
-                try:
-                    # If any PreviewImage rows exist, report True.
-                    if obj.preview_images.exists():
-                        return True
-                    # If none exist, fall back to legacy preview_data below
-                except Exception:
-                    # if relation access fails, fall back to legacy preview_data
-                    pass
-            # Fallback: return True if legacy preview_data is present
-            return bool(obj.preview_data)
-        except Exception:
-            return False
-
 
 class PreviewSerializer(serializers.Serializer):
     status = serializers.CharField()
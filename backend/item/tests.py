@@ -0,0 +1,26 @@
+from django.test import TestCase
+
+from .models import Item
+
+
+class ItemListPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        Item.objects.bulk_create([Item(external_id=i, source='test') for i in range(3)])
+
+    def test_invalid_page_size_is_400(self):
+        resp = self.client.get('/api/items/', {'page_size': 'abc'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_invalid_page_is_400(self):
+        resp = self.client.get('/api/items/', {'page': 'abc'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_last_page(self):
+        resp = self.client.get('/api/items/', {'page': 'last', 'page_size': 2})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()['results']), 1)
+
+    def test_past_the_end_page_is_404(self):
+        resp = self.client.get('/api/items/', {'page': 99999, 'page_size': 2})
+        self.assertEqual(resp.status_code, 404)
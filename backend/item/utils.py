@@ -1,16 +1,124 @@
+import json
 import os
 import re
+import threading
+import time
 import requests
+from collections import OrderedDict
+from functools import lru_cache
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import List, Optional
 from urllib.parse import urljoin
 
+try:
+    import orjson
+    _loads = orjson.loads
+except Exception:
+    _loads = json.loads
 try:
     from bs4 import BeautifulSoup
 except Exception:
     BeautifulSoup = None
+# lxml is a C parser and much faster than the pure-Python html.parser on
+# multi-MB tweet pages; keep html.parser when it isn't installed
+try:
+    from lxml import html as lxml_html
+    from lxml.etree import XPath
+    HAVE_LXML = True
+    _BS_PARSER = 'lxml'
+except Exception:
+    HAVE_LXML = False
+    _BS_PARSER = 'html.parser'
+
+# selectolax (lexbor engine) parses several times faster than lxml and
+# _fetch_via_scrape only needs attributes and script text; optional
+try:
+    from selectolax.lexbor import LexborHTMLParser as _FastParser
+except Exception:
+    _FastParser = None
+
+
 
-# store last API JSON responses for debugging when requested
-LAST_TW_API_RESP = {}
+def parse_html(html: str):
+    """Parse `html` with the fastest installed parser.
+
+    Returns ('selectolax', tree) when selectolax is available, otherwise
+    ('soup', BeautifulSoup) on the lxml parser (html.parser without lxml),
+    or (None, None) when neither is installed.
+    """
+    if _FastParser is not None:
+        return 'selectolax', _FastParser(html)
+    if BeautifulSoup is not None:
+        return 'soup', BeautifulSoup(html, _BS_PARSER)
+    return None, None
+
+
+if HAVE_LXML:
+    # Everything _fetch_via_scrape reads from the tree, as one compiled
+    # XPath each (a single C-level walk instead of several find_all passes)
+    _XP_ROOT_IMG_ATTRS = XPath(
+        "//*[@id='react-root']//img/@*[name()='src' or name()='srcset' or name()='data-srcset'"
+        " or name()='data-src' or name()='data-image-url']"
+    )
+    _XP_ROOT_BG_STYLES = XPath("//*[@id='react-root']//*[contains(@style, 'background-image')]/@style")
+    _XP_SCRIPT_TEXT = XPath('//script/text()')
+
+@lru_cache(maxsize=1)
+def _cfg():
+    """Fetch settings from the environment, read once per process."""
+    method = os.environ.get('TW_FETCH_METHOD', 'api').lower()
+    return SimpleNamespace(
+        bearer=os.environ.get('TW_BEARER'),
+        debug=bool(os.environ.get('TW_API_DEBUG')),
+        nitter_base=os.environ.get('NITTER_BASE', 'https://nitter.net').rstrip('/'),
+        aggregate=bool(os.environ.get('TW_FETCH_AGGREGATE')),
+        try_order=_try_order(method),
+    )
+
+
+# Patterns used on every scrape/nitter call, compiled once
+_RE_BG_IMAGE = re.compile(r'background-image\s*:\s*url\((?:\"|\'\'|)?([^\)\"\']+)(?:\"|\'\')?\)')
+_RE_SRCSET_HEAD = re.compile(r'^(?P<url>[^\s]+)')
+_RE_PBS_MEDIA = re.compile(r'https?://pbs\.twimg\.com/media/[^"\s<>]+')
+_RE_TWIMG = re.compile(r'https?://[^"\s<>]*twimg[^"\s<>]+')
+# media_url_https / media_url / preview_image_url JSON keys in one pass
+_RE_JSON_MEDIA_URL = re.compile(r'"(?:media_url_https|media_url|preview_image_url)"\s*:\s*"(https?://pbs\.twimg\.com/[^"]+)"')
+_RE_SCRIPT_PBS_MEDIA = re.compile(r'https?://pbs\.twimg\.com/media/[^"\s<>\)]+')
+_RE_HTTP_URL = re.compile(r'https?://[^"\s<>]+')
+
+# Shared keep-alive pool for every Twitter/Nitter/pbs request, so calls
+# (and the concurrently running backends) reuse TLS connections instead of
+# handshaking each time. The browser UA is the default; backends that need
+# different headers pass them per request.
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36',
+    'Accept-Encoding': 'gzip, deflate',
+})
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                       max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504)))
+_SESSION.mount('https://', _adapter)
+_SESSION.mount('http://', _adapter)
+# scrape/nitter pages are read up to this many (decoded) bytes
+MAX_HTML_BYTES = 4 * 1024 * 1024
+
+# Tweet media doesn't change once posted, so remember each tweet's
+# candidates (tweet_id -> (expires_at, [(url, method), ...])). Empty results
+# only live briefly so a transient failure or rate limit is retried soon.
+_MEDIA_CACHE = OrderedDict()
+_MEDIA_CACHE_MAX = 4096
+_MEDIA_CACHE_TTL = 3600
+_MEDIA_CACHE_EMPTY_TTL = 60
+_MEDIA_CACHE_LOCK = threading.Lock()
+
+# store last API JSON responses for debugging when requested; bounded to
+# the most recent tweets so long-running workers don't grow without limit
+LAST_TW_API_RESP = OrderedDict()
+_LAST_TW_API_MAX = 256
+_LAST_TW_API_LOCK = threading.Lock()
 
 
 def _fetch_via_api(tweet_url: str) -> List[str]:
@@ -21,7 +129,7 @@ def _fetch_via_api(tweet_url: str) -> List[str]:
     """
     parts = tweet_url.rstrip('/').split('/')
     tweet_id = parts[-1]
-    bearer = os.environ.get('TW_BEARER')
+    bearer = _cfg().bearer
     if not bearer:
         return []
 
@@ -33,16 +141,20 @@ def _fetch_via_api(tweet_url: str) -> List[str]:
     }
     headers = {'Authorization': f'Bearer {bearer}'}
     try:
-        r = requests.get(api, headers=headers, params=params, timeout=8)
+        r = _SESSION.get(api, headers=headers, params=params, timeout=8)
         r.raise_for_status()
-        j = r.json()
+        j = _loads(r.content)
         # store raw response and status for debugging
         try:
-            LAST_TW_API_RESP[tweet_id] = {'json': j, 'status': r.status_code}
+            with _LAST_TW_API_LOCK:
+                LAST_TW_API_RESP[tweet_id] = {'json': j, 'status': r.status_code}
+                LAST_TW_API_RESP.move_to_end(tweet_id)
+                if len(LAST_TW_API_RESP) > _LAST_TW_API_MAX:
+                    LAST_TW_API_RESP.popitem(last=False)
         except Exception:
             pass
         # optional verbose logging when env var enabled
-        if os.environ.get('TW_API_DEBUG'):
+        if _cfg().debug:
             try:
                 import logging as _logging
                 _logging.getLogger('fanart_viewer').info('Twitter API response for %s: %s', tweet_id, j)
@@ -52,27 +164,48 @@ def _fetch_via_api(tweet_url: str) -> List[str]:
         return []
 
     media = j.get('includes', {}).get('media', [])
-    urls: List[str] = []
+    # insertion-ordered dict as an ordered set (O(1) membership)
+    urls = {}
     for m in media:
         if m.get('type') == 'photo':
             # prefer explicit url fields
             for key in ('url', 'media_url_https', 'preview_image_url'):
                 v = m.get(key)
-                if v and v not in urls:
-                    urls.append(v)
-    return urls
+                if v:
+                    urls.setdefault(v, None)
+    return list(urls)
 
 
-def _fetch_via_scrape(tweet_url: str) -> List[str]:
-    # Simple HTML scraping fallback. Works for many public tweets without login.
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36'
-    }
+def _get_html(url: str, headers: Optional[dict] = None) -> Optional[str]:
+    """GET a page and return at most MAX_HTML_BYTES of it as text.
+
+    The body is streamed (gzip-decoded) and cut at the cap: anything past
+    it is inline blob data that never yields more candidate URLs, and the
+    cap bounds memory on huge pages. Returns None on any failure.
+    """
     try:
-        r = requests.get(tweet_url, headers=headers, timeout=8)
-        r.raise_for_status()
-        html = r.text
+        with _SESSION.get(url, headers=headers, timeout=8, stream=True) as r:
+            r.raise_for_status()
+            content = r.raw.read(MAX_HTML_BYTES, decode_content=True)
+            return content.decode(r.encoding or 'utf-8', errors='replace')
     except Exception:
+        return None
+
+
+def _resolve_shortlink(u: str) -> Optional[str]:
+    try:
+        r = _SESSION.head(u, timeout=8, allow_redirects=True)
+    except Exception:
+        return None
+    if r.status_code in (200, 301, 302) and r.url:
+        return r.url
+    return None
+
+
+def _fetch_via_scrape(tweet_url: str) -> List[str]:
+    # Simple HTML scraping fallback. Works for many public tweets without login.
+    html = _get_html(tweet_url)
+    if html is None:
         return []
 
     results: List[str] = []
@@ -95,8 +228,52 @@ def _fetch_via_scrape(tweet_url: str) -> List[str]:
     # avoid an uncontrolled infinite loop, this function will retry a few
     # times (controlled by `TW_SCRAPE_MAX_RETRIES`) if no images are found
     # immediately; this helps with transient rendering delays.
-    if BeautifulSoup:
-        soup = BeautifulSoup(html, 'html.parser')
+    script_texts = ()
+    if _FastParser is not None:
+        tree = _FastParser(html)
+        root = tree.css_first('#react-root')
+        if root is not None:
+            # collect all <img> sources (src, srcset, data-src/data-image-url)
+            for im in root.css('img'):
+                attrs = im.attributes
+                add(attrs.get('src'))
+                ss = attrs.get('srcset') or attrs.get('data-srcset')
+                if ss:
+                    for p in ss.split(','):
+                        p = p.strip()
+                        if p:
+                            add(p.split()[0])
+                add(attrs.get('data-src') or attrs.get('data-image-url'))
+            # background-image URLs from style attributes inside #react-root
+            # (this also covers the /photo/ anchors, which live there too)
+            for el in root.css('[style*="background-image"]'):
+                for m in _RE_BG_IMAGE.findall(el.attributes.get('style') or ''):
+                    add(m)
+        script_texts = [node.text(deep=False) for node in tree.css('script')]
+    elif HAVE_LXML:
+        try:
+            doc = lxml_html.document_fromstring(html)
+        except Exception:
+            doc = None
+        if doc is not None:
+            # collect all <img> sources (src, srcset, data-src/data-image-url)
+            # in document order
+            for v in _XP_ROOT_IMG_ATTRS(doc):
+                if v.attrname in ('srcset', 'data-srcset'):
+                    for p in v.split(','):
+                        p = p.strip()
+                        if p:
+                            add(p.split()[0])
+                else:
+                    add(v)
+            # background-image URLs from style attributes inside #react-root
+            # (this also covers the /photo/ anchors, which live there too)
+            for style in _XP_ROOT_BG_STYLES(doc):
+                for m in _RE_BG_IMAGE.findall(style):
+                    add(m)
+            script_texts = _XP_SCRIPT_TEXT(doc)
+    elif BeautifulSoup:
+        soup = BeautifulSoup(html, _BS_PARSER)
         root = soup.find(id='react-root')
         if root:
             # collect all <img> sources (src, srcset, data-src/data-image-url)
@@ -108,7 +285,7 @@ def _fetch_via_scrape(tweet_url: str) -> List[str]:
                 if ss:
                     parts = [p.strip() for p in ss.split(',') if p.strip()]
                     for p in parts:
-                        m = re.search(r'^(?P<url>[^\s]+)', p)
+                        m = _RE_SRCSET_HEAD.search(p)
                         if m:
                             add(m.group('url'))
                 ds = im.get('data-src') or im.get('data-image-url')
@@ -119,7 +296,7 @@ def _fetch_via_scrape(tweet_url: str) -> List[str]:
             for el in root.find_all(True):
                 style = el.get('style')
                 if style and 'background-image' in style:
-                    for m in re.findall(r'background-image\s*:\s*url\((?:\"|\'\'|)?([^\)\"\']+)(?:\"|\'\')?\)', style):
+                    for m in _RE_BG_IMAGE.findall(style):
                         add(m)
 
             # also handle anchors that link to /photo/.. which may wrap images
@@ -136,58 +313,49 @@ def _fetch_via_scrape(tweet_url: str) -> List[str]:
                     for div in a.find_all(True):
                         style = div.get('style')
                         if style and 'background-image' in style:
-                            for m in re.findall(r'background-image\s*:\s*url\((?:\"|\'\'|)?([^\)\"\']+)(?:\"|\'\')?\)', style):
+                            for m in _RE_BG_IMAGE.findall(style):
                                 add(m)
+        script_texts = (script.string or script.get_text() or '' for script in soup.find_all('script'))
 
     # Regex-based fallbacks to catch direct pbs.twimg links
-    matches = re.findall(r'https?://pbs\.twimg\.com/media/[^"\s<>]+', html)
+    matches = _RE_PBS_MEDIA.findall(html)
     for m in matches:
         add(m)
-    matches = re.findall(r'https?://[^"\s<>]*twimg[^"\s<>]+', html)
+    matches = _RE_TWIMG.findall(html)
     for m in matches:
         add(m)
 
     # Also inspect inline <script> blocks for embedded JSON containing
     # media URLs (keys like media_url, media_url_https, preview_image_url)
-    if BeautifulSoup:
-        for script in soup.find_all('script'):
-            try:
-                script_text = script.string or script.get_text() or ''
-            except Exception:
-                script_text = ''
-            if not script_text:
-                continue
-            # look for JSON-style keys that reference pbs.twimg.com
-            for m in re.findall(r'"media_url_https"\s*:\s*"(https?://pbs\.twimg\.com/[^"]+)"', script_text):
-                add(m)
-            for m in re.findall(r'"media_url"\s*:\s*"(https?://pbs\.twimg\.com/[^"]+)"', script_text):
-                add(m)
-            for m in re.findall(r'"preview_image_url"\s*:\s*"(https?://pbs\.twimg\.com/[^"]+)"', script_text):
-                add(m)
-            # generic pbs links inside scripts
-            for m in re.findall(r'https?://pbs\.twimg\.com/media/[^"\s<>\)]+', script_text):
-                add(m)
-
-    # Resolve pic.twitter.com shortlinks by following redirects (cheap HEAD/GET)
-    resolved = []
-    for u in list(results):
-        if 'pic.twitter.com' in u:
-            try:
-                r = requests.get(u, headers=headers, timeout=8, allow_redirects=True)
-                if r.status_code in (200, 301, 302) and r.url:
-                    final = r.url
-                    # If redirect ended on pbs.twimg.com or twimg host, include
-                    if 'pbs.twimg.com' in final or 'twimg' in final:
-                        add(final)
-            except Exception:
-                continue
+    for script_text in script_texts:
+        # both patterns below need a pbs.twimg.com URL; most scripts on the
+        # page are bundles without one, so skip them with a substring test
+        if not script_text or 'pbs.twimg.com' not in script_text:
+            continue
+        # look for JSON-style keys that reference pbs.twimg.com
+        for m in _RE_JSON_MEDIA_URL.findall(script_text):
+            add(m)
+        # generic pbs links inside scripts
+        for m in _RE_SCRIPT_PBS_MEDIA.findall(script_text):
+            add(m)
+
+    # Resolve pic.twitter.com shortlinks by following redirects; HEAD is
+    # enough to learn the final URL without downloading the image, and the
+    # links are resolved concurrently
+    shortlinks = [u for u in results if 'pic.twitter.com' in u]
+    if shortlinks:
+        with ThreadPoolExecutor(max_workers=min(len(shortlinks), 8)) as ex:
+            for final in ex.map(_resolve_shortlink, shortlinks):
+                # If redirect ended on pbs.twimg.com or twimg host, include
+                if final and ('pbs.twimg.com' in final or 'twimg' in final):
+                    add(final)
 
     return results
 
 
 def _fetch_via_nitter(tweet_url: str) -> List[str]:
     # Use a Nitter instance as an alternative front-end. Configure via NITTER_BASE env var.
-    nitter_base = os.environ.get('NITTER_BASE', 'https://nitter.net').rstrip('/')
+    nitter_base = _cfg().nitter_base
     # convert https://twitter.com/user/status/ID to nitter URL
     parts = tweet_url.split('/')
     if len(parts) < 5:
@@ -196,29 +364,91 @@ def _fetch_via_nitter(tweet_url: str) -> List[str]:
     tweet_id = parts[-1]
     nitter_status = f"{nitter_base}/{user}/status/{tweet_id}"
     headers = {'User-Agent': 'Mozilla/5.0'}
-    try:
-        r = requests.get(nitter_status, headers=headers, timeout=8)
-        r.raise_for_status()
-        html = r.text
-    except Exception:
+    html = _get_html(nitter_status, headers=headers)
+    if html is None:
         return None
 
-    results: List[str] = []
+    # insertion-ordered dict as an ordered set (O(1) membership)
+    results = {}
     if BeautifulSoup:
-        soup = BeautifulSoup(html, 'html.parser')
+        soup = BeautifulSoup(html, _BS_PARSER)
         imgs = [img.get('src') for img in soup.find_all('img') if img.get('src')]
         for src in imgs:
             full = urljoin(nitter_status, src)
-            if full and ("pbs.twimg.com" in full or full.startswith('http')) and full not in results:
-                results.append(full)
+            if full and ("pbs.twimg.com" in full or full.startswith('http')):
+                results.setdefault(full, None)
 
     if not results:
-        matches = re.findall(r'https?://[^"\s<>]+', html)
+        matches = _RE_HTTP_URL.findall(html)
         for m in matches:
             if 'pbs.twimg.com' in m or 'pic.' in m:
-                if m not in results:
-                    results.append(m)
-    return results
+                results.setdefault(m, None)
+    return list(results)
+
+
+_FETCHERS = {
+    'api': _fetch_via_api,
+    'scrape': _fetch_via_scrape,
+    'nitter': _fetch_via_nitter,
+}
+
+
+def _try_order(method: str) -> tuple:
+    # the configured method first, then the others as fallbacks
+    if method == 'api':
+        return ('api', 'scrape', 'nitter')
+    if method == 'scrape':
+        return ('scrape', 'api', 'nitter')
+    if method == 'nitter':
+        return ('nitter', 'scrape', 'api')
+    return (method, 'api', 'scrape', 'nitter')
+
+
+def _run_backends(tweet_url: str, try_order: tuple) -> List[tuple]:
+    """Run the backends in `try_order` concurrently.
+
+    Each backend is one or more blocking HTTP requests, so running them on
+    threads makes the total wait that of the slowest backend rather than
+    the sum. Returns (method, urls) pairs in `try_order` order; a backend
+    that fails or is unknown yields an empty list.
+
+    When the API is the preferred backend (first known entry of `try_order`,
+    i.e. `TW_FETCH_METHOD` is `api` or `auto`) its answer is authoritative:
+    unless `TW_FETCH_AGGREGATE` is set, it is asked first and, when it
+    returns pbs media, the scrape and nitter backends are skipped entirely.
+    An explicit `scrape`/`nitter` choice always runs its backend.
+    """
+    def run(m):
+        fn = _FETCHERS.get(m)
+        if fn is None:
+            return []
+        try:
+            return fn(tweet_url) or []
+        except Exception:
+            return []
+
+    done = {}
+    preferred = next((m for m in try_order if m in _FETCHERS), None)
+    if preferred == 'api' and not _cfg().aggregate:
+        urls = run('api')
+        if any('pbs.twimg.com/media/' in u for u in urls):
+            return [('api', urls)]
+        done['api'] = urls
+    rest = [m for m in try_order if m not in done]
+    if rest:
+        with ThreadPoolExecutor(max_workers=len(rest)) as ex:
+            done.update(zip(rest, ex.map(run, rest)))
+    return [(m, done[m]) for m in try_order]
+
+
+def _tweet_id(tweet_url: str) -> str:
+    return tweet_url.rstrip('/').split('/')[-1]
+
+
+def invalidate_tweet_media(tweet_id: str) -> None:
+    """Forget the cached media candidates for `tweet_id`."""
+    with _MEDIA_CACHE_LOCK:
+        _MEDIA_CACHE.pop(tweet_id, None)
 
 
 def fetch_twitter_media_urls(tweet_url: str) -> List[str]:
@@ -229,42 +459,9 @@ def fetch_twitter_media_urls(tweet_url: str) -> List[str]:
       - 'nitter': fetch via Nitter instance (configure `NITTER_BASE`)
 
     If the chosen method fails, function will try sensible fallbacks.
+    Results are cached per tweet id (see `fetch_twitter_media_urls_with_sources`).
     """
-    method = os.environ.get('TW_FETCH_METHOD', 'api').lower()
-
-    # build try order
-    if method == 'api':
-        try_order = ['api', 'scrape', 'nitter']
-    elif method == 'scrape':
-        try_order = ['scrape', 'api', 'nitter']
-    elif method == 'nitter':
-        try_order = ['nitter', 'scrape', 'api']
-    else:
-        try_order = [method, 'api', 'scrape', 'nitter']
-
-    collected: List[str] = []
-    for m in try_order:
-        try:
-            if m == 'api':
-                urls = _fetch_via_api(tweet_url)
-            elif m == 'scrape':
-                urls = _fetch_via_scrape(tweet_url)
-            elif m == 'nitter':
-                urls = _fetch_via_nitter(tweet_url)
-            else:
-                urls = []
-        except Exception:
-            urls = []
-        if not urls:
-            continue
-        # extend preserving order and uniqueness
-        for u in urls:
-            if u and u not in collected:
-                collected.append(u)
-        # continue trying other methods to aggregate additional candidates
-        # (some methods may return non-media hits like emoji; collecting
-        # from multiple backends improves coverage)
-    return collected
+    return [u for u, _ in fetch_twitter_media_urls_with_sources(tweet_url)]
 
 
 def get_last_api_response(tweet_url: str):
@@ -272,7 +469,8 @@ def get_last_api_response(tweet_url: str):
     try:
         parts = tweet_url.rstrip('/').split('/')
         tweet_id = parts[-1]
-        return LAST_TW_API_RESP.get(tweet_id)
+        with _LAST_TW_API_LOCK:
+            return LAST_TW_API_RESP.get(tweet_id)
     except Exception:
         return None
 
@@ -281,39 +479,41 @@ def fetch_twitter_media_urls_with_sources(tweet_url: str) -> List[tuple]:
     """
     Like `fetch_twitter_media_urls` but returns a list of (url, method)
     tuples so callers can know which backend produced each candidate.
+
+    Results are cached per tweet id for an hour (a minute when nothing was
+    found); use `invalidate_tweet_media` to force a refetch.
     """
-    method = os.environ.get('TW_FETCH_METHOD', 'api').lower()
-    if method == 'api':
-        try_order = ['api', 'scrape', 'nitter']
-    elif method == 'scrape':
-        try_order = ['scrape', 'api', 'nitter']
-    elif method == 'nitter':
-        try_order = ['nitter', 'scrape', 'api']
-    else:
-        try_order = [method, 'api', 'scrape', 'nitter']
+    tweet_id = _tweet_id(tweet_url)
+    now = time.monotonic()
+    with _MEDIA_CACHE_LOCK:
+        hit = _MEDIA_CACHE.get(tweet_id)
+        if hit is not None and hit[0] > now:
+            _MEDIA_CACHE.move_to_end(tweet_id)
+            return list(hit[1])
+
+    try_order = _cfg().try_order
 
     collected = []
     seen = set()
-    for m in try_order:
-        try:
-            if m == 'api':
-                urls = _fetch_via_api(tweet_url)
-            elif m == 'scrape':
-                urls = _fetch_via_scrape(tweet_url)
-            elif m == 'nitter':
-                urls = _fetch_via_nitter(tweet_url)
-            else:
-                urls = []
-        except Exception:
-            urls = []
+    for m, urls in _run_backends(tweet_url, try_order):
         if not urls:
             continue
+        # extend preserving order and uniqueness, and continue with the other
+        # methods to aggregate additional candidates (some methods may return
+        # non-media hits like emoji) unless the API already answered with
+        # media, see _run_backends
         for u in urls:
             if u and u not in seen:
                 collected.append((u, m))
                 seen.add(u)
 
-    return collected
+    ttl = _MEDIA_CACHE_TTL if collected else _MEDIA_CACHE_EMPTY_TTL
+    with _MEDIA_CACHE_LOCK:
+        _MEDIA_CACHE[tweet_id] = (now + ttl, collected)
+        _MEDIA_CACHE.move_to_end(tweet_id)
+        if len(_MEDIA_CACHE) > _MEDIA_CACHE_MAX:
+            _MEDIA_CACHE.popitem(last=False)
+    return list(collected)
 
 
 def fetch_twitter_media_url(tweet_url: str) -> Optional[str]:
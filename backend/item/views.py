@@ -7,8 +7,15 @@ older "from_rust" wording has been removed.
 
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import APIException
 from rest_framework.response import Response
+from django.db import transaction
+from django.db.models import BooleanField, Count, Exists, ExpressionWrapper, Max, OuterRef, Q
+from django.db.models.functions import Length
 from django.http import HttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import re
 from urllib.parse import urljoin, urlparse
 
@@ -18,24 +25,117 @@ from django.conf import settings
 import logging
 import traceback
 import base64
-from .utils import fetch_twitter_media_urls, fetch_twitter_media_urls_with_sources, get_last_api_response
+from .utils import fetch_twitter_media_urls, fetch_twitter_media_urls_with_sources, get_last_api_response, parse_html
 import os
 from .headless_fetch import fetch_rendered_media
 from django.views.decorators.csrf import csrf_exempt
-from django.conf import settings
 from django.core.management import call_command
+import gzip
 import io
 import tempfile
-import traceback
+import zipfile
 try:
     from .playwright_helper import fetch_images_with_playwright
     HAVE_PIXIV_PLAYWRIGHT = True
 except Exception:
     HAVE_PIXIV_PLAYWRIGHT = False
 try:
-    from bs4 import BeautifulSoup
+    # SIMD-accelerated drop-in for base64.b64decode
+    from pybase64 import b64decode as _b64decode
 except Exception:
-    BeautifulSoup = None
+    from base64 import b64decode as _b64decode
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Keep-alive pool shared by the preview fetches, so the HTML page and the
+# image candidates on the same host reuse one connection instead of a new
+# TCP+TLS handshake per request.
+_SESSION = requests.Session()
+_SESSION.headers.update({'User-Agent': 'fanart-viewer-bot/1.0'})
+_adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32,
+                       max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504)))
+_SESSION.mount('https://', _adapter)
+_SESSION.mount('http://', _adapter)
+
+
+# Regex fallbacks for image hints in fetched HTML (og:image, twitter:image,
+# link rel=image_src, first <img>), tried in this order
+_OG_RE = re.compile(r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']', re.I)
+_TW_RE = re.compile(r'<meta[^>]+name=["\']twitter:image["\'][^>]+content=["\']([^"\']+)["\']', re.I)
+_LINK_RE = re.compile(r'<link[^>]+rel=["\']image_src["\'][^>]+href=["\']([^"\']+)["\']', re.I)
+_IMG_RE = re.compile(r'<img[^>]+src=["\']([^"\']+)["\']', re.I)
+_HINT_RES = (_OG_RE, _TW_RE, _LINK_RE, _IMG_RE)
+_DATAURI_RE = re.compile(rb'data:([^;]+);base64')
+
+
+def _html_hints(html):
+    """Collect candidate image URLs from a page in one parse.
+
+    Order: og:image, twitter:image, images under #react-root (or <main>)
+    anchors, every <img>, then the first <img> of each <figure>. Parsing is
+    done by utils.parse_html (selectolax, else BeautifulSoup). Returns [] if
+    no parser is installed so the caller can fall back to the regexes.
+    """
+    hints = []
+    try:
+        kind, tree = parse_html(html)
+        if kind == 'selectolax':
+            for sel in ('meta[property="og:image"]', 'meta[name="twitter:image"]'):
+                node = tree.css_first(sel)
+                if node is not None and node.attributes.get('content'):
+                    hints.append(node.attributes.get('content'))
+            # Twitter uses id="react-root"; search that subtree first
+            root = tree.css_first('#react-root')
+            mains = [root] if root is not None else tree.css('main')
+            for mtag in mains:
+                for im in mtag.css('a img'):
+                    src = im.attributes.get('src')
+                    if src:
+                        hints.append(src)
+            for im in tree.css('img'):
+                src = im.attributes.get('src')
+                if src:
+                    hints.append(src)
+            for fig in tree.css('figure'):
+                im = fig.css_first('img')
+                if im is not None and im.attributes.get('src'):
+                    hints.append(im.attributes.get('src'))
+        elif kind == 'soup':
+            soup = tree
+            # Open Graph / twitter meta images first
+            og = soup.find('meta', property='og:image')
+            if og and og.get('content'):
+                hints.append(og.get('content'))
+            tw = soup.find('meta', attrs={'name': 'twitter:image'})
+            if tw and tw.get('content'):
+                hints.append(tw.get('content'))
+
+            # Target the common react-root -> main -> a -> img chain
+            # Note: Twitter uses an element with id="react-root" so
+            # prefer locating by id (not class) to match actual pages.
+            root = soup.find(id='react-root')
+            mains = [root] if root else soup.find_all('main')
+            for mtag in mains:
+                for a in mtag.find_all('a'):
+                    for im in a.find_all('img'):
+                        src = im.get('src')
+                        if src:
+                            hints.append(src)
+
+            # Generic fallbacks
+            for im in soup.find_all('img'):
+                s = im.get('src')
+                if s:
+                    hints.append(s)
+            for fig in soup.find_all('figure'):
+                im = fig.find('img')
+                if im and im.get('src'):
+                    hints.append(im.get('src'))
+    except Exception:
+        # parsing failed; keep what we have, caller falls back to regex if empty
+        pass
+    return hints
 
 
 def _fetch_image_via_requests(url, min_size=None):
@@ -50,10 +150,8 @@ def _fetch_image_via_requests(url, min_size=None):
     and why to call it (HTML path, renderer path). Keeping it top-level
     makes the network I/O boundary explicit.
     """
-    headers = {'User-Agent': 'fanart-viewer-bot/1.0'}
     try:
-        import requests as _requests
-        r = _requests.get(url, timeout=15, headers=headers, allow_redirects=True)
+        r = _SESSION.get(url, timeout=15, allow_redirects=True)
         ct = r.headers.get('content-type', '')
         if r.status_code == 200 and ct and ct.split(';', 1)[0].startswith('image'):
             mime = ct.split(';', 1)[0].lower()
@@ -72,11 +170,62 @@ def _fetch_image_via_requests(url, min_size=None):
     return None, None
 
 
+def _with_has_preview(qs):
+    """Annotate `has_preview` (read by ItemSerializer) on an Item queryset.
+
+    True when the item has any PreviewImage row or legacy `preview_data`;
+    the database computes it for every row in the same query.
+    """
+    return qs.annotate(
+        has_preview=ExpressionWrapper(
+            Q(Exists(PreviewImage.objects.filter(item=OuterRef('pk'))))
+            | (Q(preview_data__isnull=False) & ~Q(preview_data=b'')),
+            output_field=BooleanField(),
+        ),
+    )
+
+
+def _items_etag(request):
+    """Weak ETag for the item list at the requested page/filters.
+
+    Covers item edits (updated_at), item inserts/deletes (count) and preview
+    changes, since has_preview is part of every serialized row.
+    """
+    items = Item.objects.aggregate(n=Count('id'), last=Max('updated_at'))
+    previews = PreviewImage.objects.aggregate(n=Count('id'), last=Max('id'))
+    stamp = (
+        request.get_full_path(),
+        items['n'], items['last'].isoformat() if items['last'] else '',
+        previews['n'], previews['last'] or 0,
+    )
+    digest = hashlib.md5(repr(stamp).encode(), usedforsecurity=False).hexdigest()
+    return f'W/"items-{digest}"'
+
+
+def _list_items(qs):
+    """Shape an Item queryset for serialized listings.
+
+    The legacy `preview_data` blob is never serialized, so it is deferred
+    (not shipped from Postgres at all).
+    """
+    return _with_has_preview(qs.defer('preview_data'))
+
+
 class ItemViewSet(viewsets.ReadOnlyModelViewSet):
     """Item viewset exposing read-only item list/retrieve and minimal preview endpoints."""
     queryset = Item.objects.all().order_by('external_id')
     serializer_class = ItemSerializer
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == 'list':
+            return _list_items(qs)
+        if self.action in ('previews', 'preview_index'):
+            # these only read PreviewImage rows, never the legacy blob
+            qs = qs.defer('preview_data')
+        # detail actions serialize the item too (retrieve, update_fields)
+        return _with_has_preview(qs)
+
     def list(self, request, *args, **kwargs):
         # Log incoming request headers and remote addr to help reproduce
         # browser-specific 500s (captures headers, path and remote address).
@@ -87,7 +236,18 @@ class ItemViewSet(viewsets.ReadOnlyModelViewSet):
                 request.META.get('REMOTE_ADDR'),
                 dict(request.headers)
             )
-            return super().list(request, *args, **kwargs)
+            # Revalidations of an unchanged list get a 304 before the
+            # queryset is run or serialized
+            etag = _items_etag(request)
+            not_modified = get_conditional_response(request, etag=etag)
+            if not_modified is not None:
+                return not_modified
+            response = super().list(request, *args, **kwargs)
+            response['ETag'] = etag
+            return response
+        except APIException:
+            # client errors (e.g. bad page/page_size) keep their own status
+            raise
         except Exception as e:
             # Log full traceback to help debugging 500s in development
             logging.exception('Unhandled exception in ItemViewSet.list')
@@ -98,20 +258,21 @@ class ItemViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['get'])
     def preview(self, request, pk=None):
         item = self.get_object()
-        imgs = list(item.preview_images.order_by('order'))
         idx_param = request.GET.get('index')
         if idx_param is not None:
             try:
                 idx = int(idx_param)
             except Exception:
                 return Response({'detail': 'invalid index'}, status=status.HTTP_400_BAD_REQUEST)
-            if idx < 0 or idx >= len(imgs):
+            # load only the requested row's blob, not every preview's
+            img = item.preview_images.order_by('order')[idx:idx + 1].first() if idx >= 0 else None
+            if img is None:
                 return Response({'detail': 'index out of range'}, status=status.HTTP_404_NOT_FOUND)
-            img = imgs[idx]
             return HttpResponse(img.data, content_type=img.content_type or 'application/octet-stream')
 
-        if imgs:
-            best = max(imgs, key=lambda x: len(x.data or b''))
+        # pick the largest image by byte length in SQL and load just that one
+        best = item.preview_images.annotate(size=Length('data')).order_by('-size', 'order').first()
+        if best is not None:
             return HttpResponse(best.data, content_type=best.content_type or 'application/octet-stream')
 
         if item.preview_data:
@@ -162,93 +323,44 @@ class ItemViewSet(viewsets.ReadOnlyModelViewSet):
         else:
             # Fetch HTML and try to extract common image hints (og:image, twitter:image, img src)
             try:
-                import requests
-                r = requests.get(target_url, timeout=15, headers={'User-Agent': 'fanart-viewer-bot/1.0'})
+                r = _SESSION.get(target_url, timeout=15)
                 html = r.text or ''
             except Exception:
                 html = ''
 
-            # Use BeautifulSoup (if available) to walk the DOM and collect
-            # candidate image URLs. We aim to find images under the
-            # 'div.react-root -> main.main -> a -> img' pattern, but also
-            # fall back to common selectors (article img, figure img, og: tags).
-            hints = []
-            try:
-                if 'BeautifulSoup' in globals() and BeautifulSoup is not None:
-                    soup = BeautifulSoup(html, 'html.parser')
-                    # Open Graph / twitter meta images first
-                    og = soup.find('meta', property='og:image')
-                    if og and og.get('content'):
-                        hints.append(og.get('content'))
-                    tw = soup.find('meta', attrs={'name': 'twitter:image'})
-                    if tw and tw.get('content'):
-                        hints.append(tw.get('content'))
-
-                    # Target the common react-root -> main -> a -> img chain
-                    # Note: Twitter uses an element with id="react-root" so
-                    # prefer locating by id (not class) to match actual pages.
-                    root = soup.find(id='react-root')
-                    mains = []
-                    if root:
-                        # search within the react-root subtree for anchor->img patterns
-                        mains = [root]
-                    if not mains:
-                        mains = soup.find_all('main')
-                    for mtag in mains:
-                        for a in mtag.find_all('a'):
-                            for im in a.find_all('img'):
-                                src = im.get('src')
-                                if src:
-                                    hints.append(src)
-
-                    # Generic fallbacks
-                    for im in soup.find_all('img'):
-                        s = im.get('src')
-                        if s:
-                            hints.append(s)
-                    for fig in soup.find_all('figure'):
-                        im = fig.find('img')
-                        if im and im.get('src'):
-                            hints.append(im.get('src'))
-            except Exception:
-                # parsing failed; fall back to regex below
-                pass
+            # Walk the DOM (selectolax or BeautifulSoup, if available) to
+            # collect candidate image URLs, see _html_hints.
+            hints = _html_hints(html)
 
-            # If BeautifulSoup parsing didn't yield anything, fallback to regex
+            # If DOM parsing didn't yield anything, fallback to regex
             if not hints:
-                m = re.search(r'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']', html, re.I)
-                if m:
-                    hints.append(m.group(1))
-                m = re.search(r'<meta[^>]+name=["\']twitter:image["\'][^>]+content=["\']([^"\']+)["\']', html, re.I)
-                if m:
-                    hints.append(m.group(1))
-                m = re.search(r'<link[^>]+rel=["\']image_src["\'][^>]+href=["\']([^"\']+)["\']', html, re.I)
-                if m:
-                    hints.append(m.group(1))
-                m = re.search(r'<img[^>]+src=["\']([^"\']+)["\']', html, re.I)
-                if m:
-                    hints.append(m.group(1))
-
-            # Resolve relative URLs and attempt fetches for ALL hints (do not stop on first)
-            seen = set()
+                for hint_re in _HINT_RES:
+                    m = hint_re.search(html)
+                    if m:
+                        hints.append(m.group(1))
+
+            # Resolve relative URLs and attempt fetches for ALL hints (do not
+            # stop on first). The fetches run concurrently over the shared
+            # session pool; results keep the hint order.
+            cand_urls = list(dict.fromkeys(urljoin(target_url, h) for h in hints if h))
+            seen = set(cand_urls)
             # collect candidate source mapping for debug/UI
             candidate_sources = {}
-            for h in hints:
-                if not h:
-                    continue
+
+            def _safe_fetch(u):
                 try:
-                    cand_url = urljoin(target_url, h)
-                    if cand_url in seen:
-                        continue
-                    seen.add(cand_url)
-                    b, ct = _internal_fetch(cand_url)
-                    if b and ct:
-                        candidates.append((cand_url, b, ct))
-                        used_method = 'html'
-                        # record where this candidate came from
-                        candidate_sources[cand_url] = 'html'
+                    return _internal_fetch(u)
                 except Exception:
-                    continue
+                    return None, None
+
+            if cand_urls:
+                with ThreadPoolExecutor(max_workers=min(len(cand_urls), 8)) as ex:
+                    for cand_url, (b, ct) in zip(cand_urls, ex.map(_safe_fetch, cand_urls)):
+                        if b and ct:
+                            candidates.append((cand_url, b, ct))
+                            used_method = 'html'
+                            # record where this candidate came from
+                            candidate_sources[cand_url] = 'html'
 
             # For Twitter/X targets, also call the unified twitter helper to
             # aggregate additional HTML-derived candidates (scrape/nitter).
@@ -529,30 +641,37 @@ class ItemViewSet(viewsets.ReadOnlyModelViewSet):
         images = data.get('images') or []
         if not isinstance(images, list) or not images:
             return Response({'detail': 'No images provided'}, status=status.HTTP_400_BAD_REQUEST)
-        PreviewImage.objects.filter(item=item).delete()
+        objs = []
         saved = []
         for idx, img in enumerate(images):
             data_uri = img.get('data_uri') if isinstance(img, dict) else None
             url = img.get('url') if isinstance(img, dict) else None
             if data_uri:
                 try:
-                    import base64
-                    header, b64 = data_uri.split(',', 1)
-                    body = base64.b64decode(b64)
-                    m = re.match(r'data:([^;]+);base64', header)
-                    ctype = m.group(1) if m else 'application/octet-stream'
-                    PreviewImage.objects.create(item=item, order=idx, data=body, content_type=ctype)
+                    # work on bytes so the payload isn't re-encoded by the decoder
+                    if isinstance(data_uri, str):
+                        data_uri = data_uri.encode('ascii')
+                    sep = data_uri.index(b',')
+                    body = _b64decode(data_uri[sep + 1:])
+                    m = _DATAURI_RE.match(data_uri, 0, sep)
+                    ctype = m.group(1).decode('ascii') if m else 'application/octet-stream'
+                    objs.append(PreviewImage(item=item, order=idx, data=body, content_type=ctype))
                     saved.append({'index': idx, 'url': url, 'size': len(body), 'content_type': ctype})
                 except Exception:
                     continue
         if not saved:
             return Response({'detail': 'No images saved'}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        # replace the previews in one transaction with a single batched INSERT
+        with transaction.atomic():
+            PreviewImage.objects.filter(item=item).delete()
+            PreviewImage.objects.bulk_create(objs, batch_size=100)
         return Response({'status': 'saved', 'count': len(saved), 'saved': saved})
 
     @action(detail=True, methods=['get'], url_path='previews')
     def previews(self, request, pk=None):
         item = self.get_object()
-        imgs = item.preview_images.order_by('order')
+        # metadata only; the blobs are served by preview_index
+        imgs = item.preview_images.only('id', 'order', 'content_type').order_by('order')
         data = []
         for idx, img in enumerate(imgs):
             data.append({'index': idx, 'url': f"/api/items/{item.id}/previews/{idx}/", 'content_type': img.content_type})
@@ -565,17 +684,20 @@ class ItemViewSet(viewsets.ReadOnlyModelViewSet):
             idxi = int(idx)
         except Exception:
             return Response({'detail': 'invalid index'}, status=status.HTTP_400_BAD_REQUEST)
-        imgs = list(item.preview_images.order_by('order'))
-        if idxi < 0 or idxi >= len(imgs):
+        if idxi < 0:
             return Response({'detail': 'index out of range'}, status=status.HTTP_404_NOT_FOUND)
         # DELETE: remove a single preview image at the given index
         if request.method == 'DELETE':
+            # ids and order only; the blobs are never needed to delete/reorder
+            imgs = list(item.preview_images.only('id', 'order').order_by('order'))
+            if idxi >= len(imgs):
+                return Response({'detail': 'index out of range'}, status=status.HTTP_404_NOT_FOUND)
             try:
                 # delete the targeted preview image
                 target = imgs[idxi]
                 target.delete()
                 # re-order remaining preview images to keep contiguous order
-                remaining = list(item.preview_images.order_by('order'))
+                remaining = list(item.preview_images.only('id', 'order').order_by('order'))
                 for new_idx, img in enumerate(remaining):
                     if img.order != new_idx:
                         img.order = new_idx
@@ -585,8 +707,11 @@ class ItemViewSet(viewsets.ReadOnlyModelViewSet):
                 logging.exception('Failed to delete preview image')
                 return Response({'detail': 'Failed to delete preview', 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        # GET: return the image bytes for the requested index
-        img = imgs[idxi]
+        # GET: return the image bytes for the requested index, loading only
+        # that row's blob
+        img = item.preview_images.order_by('order')[idxi:idxi + 1].first()
+        if img is None:
+            return Response({'detail': 'index out of range'}, status=status.HTTP_404_NOT_FOUND)
         return HttpResponse(img.data, content_type=img.content_type or 'application/octet-stream')
 
 
@@ -640,8 +765,10 @@ def items_from_db(request):
 
     This replaces the older `items_from_rust` name and endpoint.
     """
-    qs = Item.objects.all().order_by('external_id')
-    serializer = ItemSerializer(qs, many=True, context={'request': request})
+    qs = _list_items(Item.objects.all().order_by('external_id'))
+    # stream rows through a server-side cursor instead of loading every
+    # model instance into memory before serializing
+    serializer = ItemSerializer(qs.iterator(chunk_size=500), many=True, context={'request': request})
     return JsonResponse(serializer.data, safe=False)
 
 
@@ -683,7 +810,6 @@ def restore_previews_upload(request):
 
         # Preflight
         if request.method == 'OPTIONS':
-            from django.http import HttpResponse
             resp = HttpResponse(status=200)
             resp = set_cors(resp)
             return resp
@@ -721,7 +847,6 @@ def restore_previews_upload(request):
             name = (uploaded.name or '').lower()
             # If ZIP archive
             if name.endswith('.zip'):
-                import zipfile
                 # zipfile accepts a file-like object
                 try:
                     z = zipfile.ZipFile(uploaded.file)
@@ -754,7 +879,6 @@ def restore_previews_upload(request):
 
             # If gzip (.gz)
             elif name.endswith('.gz') or name.endswith('.tgz'):
-                import gzip
                 try:
                     # uploaded.file is a file-like object; ensure at start
                     uploaded.file.seek(0)